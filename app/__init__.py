@@ -23,9 +23,11 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.db.init_db import init_db
 from app.routers import routers
+from app.utils.action_writer import action_writer
 from app.utils.client import init
 from app.utils.logger import config_logger
 from app.utils.middleware import Middleware
+from app.utils.unit_of_work import unit_of_work_init
 from app.utils.validation_error import validation_error
 from config import settings
 
@@ -42,6 +44,10 @@ async def on_startup():
     # await start_test()
 
 
+async def on_shutdown():
+    await action_writer.stop()
+
+
 app = FastAPI(
     title='Finance Express API',
     version=settings.version,
@@ -54,9 +60,10 @@ app = FastAPI(
         'name': 'Apache 2.0',
         'url': 'https://www.apache.org/licenses/LICENSE-2.0.html',
     },
-    dependencies=[Depends(init)],
+    dependencies=[Depends(init), Depends(unit_of_work_init)],
     exception_handlers={RequestValidationError: validation_error},
     on_startup=[on_startup],
+    on_shutdown=[on_shutdown],
 )
 app.add_middleware(middleware_class=BaseHTTPMiddleware, dispatch=Middleware())
 [app.include_router(router) for router in routers]
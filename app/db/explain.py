@@ -0,0 +1,112 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from app.db.models import Action, FileKey, NotificationHistory, NotificationStates, Order, OrderStates, OrderTypes, \
+    Rate, RatePair, RateTypes, Request, RequestStates, Requisite, RequisiteStates, RequisiteTypes
+from app.db.session import engine
+from app.utils.logger import config_logger
+
+
+QUERY_SHAPES = {
+    'orders_by_request': select(Order).filter_by(
+        request_id=1,
+        type=OrderTypes.INPUT,
+        state=OrderStates.WAITING,
+        is_deleted=False,
+    ).order_by(Order.id.desc()),
+    'requisites_output_by_rate': select(Requisite).filter_by(
+        type=RequisiteTypes.OUTPUT,
+        state=RequisiteStates.ENABLE,
+        output_method_id=1,
+        is_deleted=False,
+    ).order_by(Requisite.rate.desc()),
+    'actions_by_model': select(Action).filter_by(
+        model='request',
+        model_id=1,
+        action='update',
+        state='input_reservation',
+    ).order_by(Action.id.desc()),
+    'actions_archive': select(Action.id).where(
+        Action.datetime < datetime(2024, 1, 1),
+    ).order_by(Action.id.asc()),
+    'rates_actual': select(Rate).filter_by(
+        method_id=1,
+        type=RateTypes.INPUT,
+        is_deleted=False,
+    ).order_by(Rate.id.desc()),
+    'rates_pairs_actual': select(RatePair).filter_by(
+        commission_pack_value_id=1,
+        input_method_id=1,
+        output_method_id=2,
+        is_deleted=False,
+    ).order_by(RatePair.id.desc()),
+    'notifications_histories_wait': select(NotificationHistory).filter_by(
+        state=NotificationStates.WAIT,
+        is_deleted=False,
+    ).order_by(NotificationHistory.id.desc()),
+    'files_keys_by_key': select(FileKey).filter_by(
+        key='key',
+        is_deleted=False,
+    ).order_by(FileKey.id.desc()),
+    'files_keys_created_before': select(FileKey.id).where(
+        FileKey.created_at <= datetime(2024, 1, 1),
+    ).filter_by(is_deleted=False).order_by(FileKey.id.desc()),
+    'requests_confirmation_created_before': select(Request.id).where(
+        Request.created_at <= datetime(2024, 1, 1),
+    ).filter_by(state=RequestStates.CONFIRMATION, is_deleted=False).order_by(Request.id.asc()),
+    'requests_rate_fixed_before': select(Request.id).where(
+        Request.rate_fixed_at <= datetime(2024, 1, 1),
+    ).filter_by(rate_fixed=True, is_deleted=False).order_by(Request.id.desc()),
+}
+
+
+async def explain() -> list[str]:
+    """
+    Run EXPLAIN for every query shape and log the plan, EXPLAIN type ALL means full table scan.
+    :return: names of query shapes with full table scan
+    """
+    full_scans = []
+    async with engine.connect() as connection:
+        for name, query in QUERY_SHAPES.items():
+            sql = query.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+            result = await connection.execute(text(f'EXPLAIN {sql}'))
+            for row in result.mappings().all():
+                logging.info(f'{name}: table={row["table"]} type={row["type"]} key={row["key"]} rows={row["rows"]}')
+                if row['type'] == 'ALL':
+                    full_scans.append(name)
+    for name in full_scans:
+        logging.warning(f'{name}: full table scan')
+    return full_scans
+
+
+async def main():
+    config_logger()
+    full_scans = await explain()
+    await engine.dispose()
+    if full_scans:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from typing import Any, Hashable, Optional
+
+
+class IdentityMap:
+    """
+    Unit of work scoped cache of repository lookups by primary key, keyed by (model, id).
+    """
+    hits_total = 0
+    misses_total = 0
+
+    def __init__(self):
+        self.items: dict[str, dict[Hashable, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_name: str, key: Hashable) -> Optional[Any]:
+        result = self.items.get(model_name, {}).get(key)
+        if result is None:
+            self.misses += 1
+            IdentityMap.misses_total += 1
+            return
+        self.hits += 1
+        IdentityMap.hits_total += 1
+        return result
+
+    def set(self, model_name: str, key: Hashable, obj: Any) -> None:
+        self.items.setdefault(model_name, {})[key] = obj
+
+    def invalidate(self, model_name: str, id_: Optional[int] = None) -> None:
+        """
+        :param id_: drop (model, id), if None drop all lookups of model
+        """
+        items = self.items.get(model_name)
+        if not items:
+            return
+        if id_ is None:
+            items.clear()
+            return
+        items.pop(id_, None)
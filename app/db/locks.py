@@ -0,0 +1,41 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+
+@asynccontextmanager
+async def advisory_lock(name: str, timeout: int = 0) -> AsyncIterator[bool]:
+    """
+    MySQL named lock (GET_LOCK) held on its own connection, so commits of sessions do not release it.
+    :param timeout: seconds to wait for the lock, 0 is try once
+    :return: True if the lock is acquired
+    """
+    async with engine.connect() as connection:
+        result = await connection.execute(text('SELECT GET_LOCK(:name, :timeout)'), {'name': name, 'timeout': timeout})
+        locked = result.scalar() == 1
+        try:
+            yield locked
+        finally:
+            if locked:
+                await connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
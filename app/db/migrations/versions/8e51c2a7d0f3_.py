@@ -0,0 +1,64 @@
+"""empty message
+
+Revision ID: 8e51c2a7d0f3
+Revises: 3b7e0d2c9a41
+Create Date: 2026-10-18 16:20:37.518260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8e51c2a7d0f3'
+down_revision: Union[str, None] = '3b7e0d2c9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('actions', sa.Column('parameters', sa.JSON(), nullable=True))
+    op.add_column(
+        'actions',
+        sa.Column(
+            'state',
+            sa.String(length=64),
+            sa.Computed("json_unquote(json_extract(`parameters`, '$.state'))", persisted=False),
+            nullable=True,
+        ),
+    )
+    # backfill parameters from actions_parameters by batches of action ids
+    connection = op.get_bind()
+    id_min, id_max = connection.execute(sa.text('SELECT MIN(id), MAX(id) FROM actions')).one()
+    if id_min is not None:
+        for id_from in range(id_min, id_max + 1, BACKFILL_BATCH_SIZE):
+            connection.execute(
+                sa.text(
+                    'UPDATE actions a '
+                    'JOIN ('
+                    '    SELECT action_id, JSON_OBJECTAGG(`key`, `value`) AS parameters '
+                    '    FROM actions_parameters '
+                    '    WHERE action_id >= :id_from AND action_id < :id_to '
+                    '    GROUP BY action_id'
+                    ') p ON p.action_id = a.id '
+                    'SET a.parameters = p.parameters'
+                ),
+                {'id_from': id_from, 'id_to': id_from + BACKFILL_BATCH_SIZE},
+            )
+    op.create_index(
+        'ix_actions_model_model_id_action_state',
+        'actions',
+        ['model', 'model_id', 'action', 'state'],
+        unique=False,
+    )
+    op.drop_index('ix_actions_model_model_id_action', table_name='actions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_actions_model_model_id_action', 'actions', ['model', 'model_id', 'action'], unique=False)
+    op.drop_index('ix_actions_model_model_id_action_state', table_name='actions')
+    op.drop_column('actions', 'state')
+    op.drop_column('actions', 'parameters')
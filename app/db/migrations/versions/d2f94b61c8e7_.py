@@ -0,0 +1,76 @@
+"""empty message
+
+Revision ID: d2f94b61c8e7
+Revises: 8e51c2a7d0f3
+Create Date: 2026-10-18 17:42:09.804113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f94b61c8e7'
+down_revision: Union[str, None] = '8e51c2a7d0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def backfill(table: str, column: str, model: str, action: str, state: str = None, any_state: bool = False) -> None:
+    """
+    Set column to the datetime of the last matching action of the row, only for rows where it is still NULL.
+    """
+    where = 'model = :model AND action = :action'
+    if state:
+        where += ' AND state = :state'
+    elif any_state:
+        where += ' AND state IS NOT NULL'
+    op.get_bind().execute(
+        sa.text(
+            f'UPDATE {table} t '
+            f'JOIN ('
+            f'    SELECT model_id, MAX(datetime) AS datetime FROM actions WHERE {where} GROUP BY model_id'
+            f') a ON a.model_id = t.id '
+            f'SET t.{column} = a.datetime '
+            f'WHERE t.{column} IS NULL'
+        ),
+        {'model': model, 'action': action, 'state': state},
+    )
+
+
+def upgrade() -> None:
+    op.add_column('requests', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('requests', sa.Column('state_changed_at', sa.DateTime(), nullable=True))
+    op.add_column('requests', sa.Column('rate_fixed_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('state_changed_at', sa.DateTime(), nullable=True))
+    op.add_column('messages', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('files_keys', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    backfill(table='requests', column='created_at', model='request', action='create')
+    backfill(table='requests', column='state_changed_at', model='request', action='update', any_state=True)
+    backfill(table='requests', column='rate_fixed_at', model='request', action='update', state='input_reservation')
+    backfill(table='orders', column='created_at', model='order', action='create')
+    backfill(table='orders', column='state_changed_at', model='order', action='update', any_state=True)
+    backfill(table='messages', column='created_at', model='message', action='create')
+    backfill(table='files_keys', column='created_at', model='file_key', action='create')
+    op.execute('UPDATE requests SET state_changed_at = created_at WHERE state_changed_at IS NULL')
+    op.execute('UPDATE orders SET state_changed_at = created_at WHERE state_changed_at IS NULL')
+
+    op.create_index('ix_requests_state_created_at', 'requests', ['state', 'created_at'], unique=False)
+    op.create_index('ix_requests_rate_fixed_rate_fixed_at', 'requests', ['rate_fixed', 'rate_fixed_at'], unique=False)
+    op.create_index('ix_files_keys_created_at', 'files_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_files_keys_created_at', table_name='files_keys')
+    op.drop_index('ix_requests_rate_fixed_rate_fixed_at', table_name='requests')
+    op.drop_index('ix_requests_state_created_at', table_name='requests')
+    op.drop_column('files_keys', 'created_at')
+    op.drop_column('messages', 'created_at')
+    op.drop_column('orders', 'state_changed_at')
+    op.drop_column('orders', 'created_at')
+    op.drop_column('requests', 'rate_fixed_at')
+    op.drop_column('requests', 'state_changed_at')
+    op.drop_column('requests', 'created_at')
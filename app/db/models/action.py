@@ -18,7 +18,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy import Column, BigInteger, String, DateTime, Index, JSON, Computed
 
 from app.db.base_class import Base
 
@@ -31,9 +31,19 @@ class Actions:
 
 class Action(Base):
     __tablename__ = 'actions'
+    __table_args__ = (
+        Index('ix_actions_model_model_id_action_state', 'model', 'model_id', 'action', 'state'),
+        Index('ix_actions_datetime', 'datetime'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     datetime = Column(DateTime, default=datetime.now)
     model = Column(String(length=64))
     model_id = Column(BigInteger)
     action = Column(String(length=256))
+    parameters = Column(JSON(), nullable=True)
+    state = Column(
+        String(length=64),
+        Computed("json_unquote(json_extract(`parameters`, '$.state'))", persisted=False),
+        nullable=True,
+    )
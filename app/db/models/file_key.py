@@ -15,7 +15,9 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, Boolean, String, ForeignKey, Index, DateTime
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -23,9 +25,14 @@ from app.db.base_class import Base
 
 class FileKey(Base):
     __tablename__ = 'files_keys'
+    __table_args__ = (
+        Index('ix_files_keys_key', 'key'),
+        Index('ix_files_keys_created_at', 'created_at'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     file_id = Column(BigInteger, ForeignKey('files.id', ondelete='SET NULL'), nullable=True)
     file = relationship('File', foreign_keys=file_id, uselist=False, lazy='selectin')
     key = Column(String(length=32))
+    created_at = Column(DateTime, default=datetime.now)
     is_deleted = Column(Boolean, default=False)
@@ -15,7 +15,9 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, Text, String
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, Text, String, DateTime
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -45,4 +47,5 @@ class Message(Base):
     role = Column(String(length=32))
     text = Column(Text)
     is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.now)
     is_deleted = Column(Boolean, default=False)
@@ -15,7 +15,7 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, Text
+from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -31,6 +31,7 @@ class NotificationTypes:
 
 class NotificationStates:
     WAIT = 'wait'
+    SENDING = 'sending'
     SUCCESS = 'success'
     ERROR = 'error'
     BLOCKED = 'blocked'
@@ -38,6 +39,9 @@ class NotificationStates:
 
 class NotificationHistory(Base):
     __tablename__ = 'notifications_histories'
+    __table_args__ = (
+        Index('ix_notifications_histories_state', 'state'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     notification_setting_id = Column(
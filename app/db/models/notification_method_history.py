@@ -23,6 +23,7 @@ from app.db.base_class import Base
 
 class NotificationMethodStates:
     WAIT = 'wait'
+    SENDING = 'sending'
     SUCCESS = 'success'
     ERROR = 'error'
     BLOCKED = 'blocked'
@@ -15,7 +15,9 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, JSON
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, JSON, Index, DateTime
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -42,6 +44,9 @@ class OrderCanceledReasons:
 
 class Order(Base):
     __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_request_id_type_state', 'request_id', 'type', 'state'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     type = Column(String(length=8))
@@ -58,4 +63,6 @@ class Order(Base):
     requisite_fields = Column(JSON())
     input_scheme_fields = Column(JSON())
     input_fields = Column(JSON(), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    state_changed_at = Column(DateTime, default=datetime.now)
     is_deleted = Column(Boolean, default=False)
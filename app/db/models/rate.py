@@ -17,7 +17,7 @@
 
 import datetime
 
-from sqlalchemy import Column, BigInteger, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, BigInteger, String, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -37,6 +37,9 @@ class RateSources:
 
 class Rate(Base):
     __tablename__ = 'rates'
+    __table_args__ = (
+        Index('ix_rates_method_id_type_id', 'method_id', 'type', 'id'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     method_id = Column(BigInteger, ForeignKey('methods.id', ondelete='SET NULL'))
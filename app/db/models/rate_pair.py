@@ -17,7 +17,7 @@
 
 import datetime
 
-from sqlalchemy import Column, BigInteger, ForeignKey, Boolean, Integer, DateTime
+from sqlalchemy import Column, BigInteger, ForeignKey, Boolean, Integer, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -25,6 +25,15 @@ from app.db.base_class import Base
 
 class RatePair(Base):
     __tablename__ = 'rates_pairs'
+    __table_args__ = (
+        Index(
+            'ix_rates_pairs_commission_pack_value_id_methods_id',
+            'commission_pack_value_id',
+            'input_method_id',
+            'output_method_id',
+            'id',
+        ),
+    )
 
     id = Column(BigInteger, primary_key=True)
     commission_pack_value_id = Column(
@@ -15,7 +15,9 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, Integer
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, Integer, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -39,6 +41,10 @@ class RequestStates:
 
 class Request(Base):
     __tablename__ = 'requests'
+    __table_args__ = (
+        Index('ix_requests_state_created_at', 'state', 'created_at'),
+        Index('ix_requests_rate_fixed_rate_fixed_at', 'rate_fixed', 'rate_fixed_at'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     name = Column(String(length=32), nullable=True)
@@ -77,4 +83,7 @@ class Request(Base):
     output_rate = Column(BigInteger, nullable=True)
     output_currency_value = Column(BigInteger, nullable=True)
 
+    created_at = Column(DateTime, default=datetime.now)
+    state_changed_at = Column(DateTime, default=datetime.now)
+    rate_fixed_at = Column(DateTime, nullable=True)
     is_deleted = Column(Boolean, default=False)
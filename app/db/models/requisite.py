@@ -15,7 +15,7 @@
 #
 
 
-from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String
+from sqlalchemy import Column, BigInteger, Boolean, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -34,6 +34,9 @@ class RequisiteStates:
 
 class Requisite(Base):
     __tablename__ = 'requisites'
+    __table_args__ = (
+        Index('ix_requisites_type_state_output_method_id_rate', 'type', 'state', 'output_method_id', 'rate'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     type = Column(String(length=8))
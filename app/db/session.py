@@ -15,10 +15,16 @@
 #
 
 
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional, Callable, Awaitable
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.db.identity_map import IdentityMap
 from config import settings
 
 engine = create_async_engine(settings.get_mysql_uri(), pool_pre_ping=True, max_overflow=-1)
@@ -29,3 +35,63 @@ SessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
 )
+
+session_context: ContextVar[Optional[AsyncSession]] = ContextVar('session_context', default=None)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """
+    Bind one AsyncSession to the current context, repositories reuse it and flush instead of commit.
+    Repository lookups are cached in IdentityMap of the session while the unit of work is open.
+    Commit once on exit, rollback on exception. Nested calls join the outer unit of work.
+    Callbacks in session.info['after_commit'] are awaited after commit and close of the session, outside of the
+    unit of work, e.g. publishing of domain events. Their errors are logged, committed data is not affected.
+    """
+    session = session_context.get()
+    if session is not None:
+        yield session
+        return
+    async with SessionLocal() as session:
+        identity_map = IdentityMap()
+        session.info['identity_map'] = identity_map
+        token = session_context.set(session)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            session_context.reset(token)
+            logging.debug(f'identity map hits={identity_map.hits} misses={identity_map.misses}')
+    for callback in session.info.get('after_commit', []):
+        try:
+            await callback()
+        except Exception as e:
+            logging.error(f'after commit callback failed: {e}')
+
+
+@asynccontextmanager
+async def unit_of_work_own() -> AsyncIterator[AsyncSession]:
+    """
+    Own unit of work even if another one is bound to the context, committed on its exit independently of the outer
+    one, e.g. one item of a task scan.
+    """
+    token = session_context.set(None)
+    try:
+        async with unit_of_work() as session:
+            yield session
+    finally:
+        session_context.reset(token)
+
+
+async def run_after_commit(callback: Callable[[], Awaitable]) -> None:
+    """
+    Await callback after commit of the bound unit of work, at once if there is none.
+    """
+    session = session_context.get()
+    if session is None:
+        await callback()
+        return
+    session.info.setdefault('after_commit', []).append(callback)
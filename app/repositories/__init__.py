@@ -21,6 +21,7 @@ from .account_contact import AccountContactRepository
 from .account_role import AccountRoleRepository
 from .action import ActionRepository
 from .action_parameter import ActionParameterRepository
+from .base import LoadProfiles
 from .client_text import ClientTextRepository
 from .commission_pack import CommissionPackRepository
 from .commission_pack_value import CommissionPackValueRepository
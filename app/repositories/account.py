@@ -22,7 +22,6 @@ from sqlalchemy.sql.operators import and_
 from app.db.models import Account
 from app.repositories.base import BaseRepository
 from app.utils.exceptions import AccountWithUsernameDoesNotExist
-from config import settings
 
 
 class AccountRepository(BaseRepository[Account]):
@@ -37,14 +36,16 @@ class AccountRepository(BaseRepository[Account]):
     async def is_exist_by_username(self, username: str) -> bool:
         return await self.is_exist(username=username)
 
-    async def search(self, id_, username: str, page: int) -> tuple[list[Account], int]:
+    async def search(
+            self,
+            id_,
+            username: str,
+            page: int,
+            cursor: Optional[str] = None,
+    ) -> tuple[list[Account], int, Optional[str]]:
         if not username:
             username = ''
         if not id_:
             id_ = ''
         custom_where = and_(self.model.id.like(f'%{id_}%'), self.model.username.like(f'%{username}%'))
-        custom_limit = settings.items_per_page
-        custom_offset = settings.items_per_page * (page - 1)
-        result = await self.get_list(custom_where=custom_where, custom_limit=custom_limit, custom_offset=custom_offset)
-        result_count = len(await self.get_list(custom_where=custom_where))
-        return result, result_count
+        return await self.get_page(custom_where=custom_where, page=page, cursor=cursor)
@@ -15,16 +15,54 @@
 #
 
 
-from typing import Optional
+from typing import Optional, List
+
+from sqlalchemy import func, delete
 
 from app.db.models import Action, ActionParameter
-from app.repositories.action_parameter import ActionParameterRepository
 from app.repositories.base import BaseRepository
 
 
 class ActionRepository(BaseRepository[Action]):
     model = Action
 
-    @staticmethod
-    async def create_parameter(action: Action, key: str, value: str) -> Optional[ActionParameter]:
-        return await ActionParameterRepository().create(action=action, key=key, value=value)
+    async def get_by_parameter(
+            self,
+            model: str,
+            model_id: int,
+            action: str,
+            key: Optional[str] = None,
+            value: Optional[str] = None,
+    ) -> Optional[Action]:
+        """
+        Last action of model with parameter key = value, or with any parameter if key is None.
+        state is looked up by its indexed generated column, other keys by JSON path.
+        """
+        if key is None:
+            return await self.get(
+                custom_where=func.json_length(self.model.parameters) > 0,
+                model=model,
+                model_id=model_id,
+                action=action,
+            )
+        if key == 'state':
+            return await self.get(model=model, model_id=model_id, action=action, state=str(value))
+        return await self.get(
+            custom_where=func.json_unquote(func.json_extract(self.model.parameters, f'$.{key}')) == str(value),
+            model=model,
+            model_id=model_id,
+            action=action,
+        )
+
+    async def delete_by_ids(self, ids: List[int]) -> int:
+        """
+        Hard DELETE of actions and their legacy parameters, used by archival only.
+        :return: count of deleted actions
+        """
+        if not ids:
+            return 0
+        async with self._get_session() as session:
+            await session.execute(delete(ActionParameter).where(ActionParameter.action_id.in_(ids)))
+            result = await session.execute(delete(self.model).where(self.model.id.in_(ids)))
+            await self._commit(session)
+            return result.rowcount
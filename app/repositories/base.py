@@ -15,22 +15,40 @@
 #
 
 
+from contextlib import nullcontext
+from datetime import datetime
 from decimal import Decimal
 from types import NoneType
-from typing import TypeVar, Generic, List, Optional, Any
+from typing import TypeVar, Generic, List, Optional, Any, Hashable, AsyncIterator
 
-from sqlalchemy import select
+from sqlalchemy import select, func, insert, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.operators import and_
 
 from app.db.base_class import Base
+from app.db.identity_map import IdentityMap
 from app.db.models import Action, ActionParameter
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, session_context
+from app.utils.coordinator import coordinator
+from app.utils.cursor import cursor_decode, cursor_encode
 from app.utils.exceptions import ModelDoesNotExist
+from config import settings
 
 ModelType = TypeVar('ModelType', bound=Base)
 
 
+class LoadProfiles:
+    BARE = 'bare'
+    WITH_REQUEST = 'with_request'
+    FULL = 'full'
+
+
 class BaseRepository(Generic[ModelType]):
     model: Any
+    load_profiles: dict = {}
 
     async def is_exist(self, **filters) -> bool:
         result = await self.get(**filters)
@@ -40,25 +58,60 @@ class BaseRepository(Generic[ModelType]):
 
     async def create(self, **obj_in_data) -> ModelType:
         obj_in_data = self._convert_obj(obj_in_data)
+        self._invalidate()
         async with self._get_session() as session:
             db_obj = self.model(**obj_in_data)
 
             session.add(db_obj)
 
-            await session.commit()
+            await self._commit(session)
             await session.refresh(db_obj)
 
             return db_obj
 
+    async def create_many(self, objs_in_data: List[dict]) -> int:
+        """
+        Insert all rows with one executemany, without refreshing created objects.
+        :return: count of created rows
+        """
+        if not objs_in_data:
+            return 0
+        objs_in_data = [self._convert_obj(obj_in_data) for obj_in_data in objs_in_data]
+        self._invalidate()
+        async with self._get_session() as session:
+            await session.execute(insert(self.model), objs_in_data)
+            await self._commit(session)
+        return len(objs_in_data)
+
+    async def upsert_many(self, objs_in_data: List[dict], update_keys: List[str]) -> int:
+        """
+        INSERT ... ON DUPLICATE KEY UPDATE of all rows in one statement, rows must have the same keys.
+        :param update_keys: columns to overwrite when row already exists
+        :return: count of affected rows
+        """
+        if not objs_in_data:
+            return 0
+        objs_in_data = [self._convert_obj(obj_in_data) for obj_in_data in objs_in_data]
+        custom_insert = mysql_insert(self.model).values(objs_in_data)
+        custom_insert = custom_insert.on_duplicate_key_update(
+            {key: custom_insert.inserted[key] for key in update_keys},
+        )
+        self._invalidate()
+        async with self._get_session() as session:
+            result = await session.execute(custom_insert)
+            await self._commit(session)
+            return result.rowcount
+
     async def get_list(
             self,
             custom_where=None,
             custom_order=None,
             custom_limit=None,
             custom_offset=None,
+            load: str = LoadProfiles.FULL,
             **filters,
     ) -> List[ModelType]:
-        custom_select = select(self.model)
+        custom_select = select(self.model).options(*self._get_load_options(load=load))
         if self.model.__name__ not in [Action.__name__, ActionParameter.__name__]:
             filters.update(is_deleted=False)
         if custom_where is not None:
@@ -76,8 +129,90 @@ class BaseRepository(Generic[ModelType]):
             result = await session.execute(custom_select.filter_by(**filters))
             return result.scalars().all()
 
-    async def get_by_id(self, id_: int, **filters) -> Optional[ModelType]:
-        result = await self.get(id=id_, **filters)
+    async def stream(
+            self,
+            custom_where=None,
+            custom_order=None,
+            chunk_size: Optional[int] = None,
+            load: str = LoadProfiles.FULL,
+            partitioned: bool = False,
+            **filters,
+    ) -> AsyncIterator[ModelType]:
+        """
+        Iterate rows without materialising all of them. Ids are streamed by a server side cursor of own session
+        (yield_per chunk_size), objects of every chunk are loaded by one IN query in the current session, so the
+        loop body can keep using repositories while the cursor is open.
+        :param partitioned: only ids of partition of this replica, see Coordinator.get_partition. Partitions move
+        when replicas come and go, so one id can be scanned by two replicas at once, loop bodies of partitioned
+        scans must be idempotent, e.g. act only if a guarded update_atomic of the row state matched
+        """
+        if chunk_size is None:
+            chunk_size = settings.stream_chunk_size
+        partition = coordinator.get_partition() if partitioned else None
+        if partition:
+            partitions_count, partition_index = partition
+            if partition_index is None:
+                return
+            partition_where = self.model.id % partitions_count == partition_index
+            custom_where = partition_where if custom_where is None else and_(custom_where, partition_where)
+        stream_filters = dict(filters)
+        if self.model.__name__ not in [Action.__name__, ActionParameter.__name__]:
+            stream_filters.update(is_deleted=False)
+        custom_select = select(self.model.id)
+        if custom_where is not None:
+            custom_select = custom_select.where(custom_where)
+        if custom_order is None:
+            custom_select = custom_select.order_by(self.model.id.desc())
+        else:
+            custom_select = custom_select.order_by(custom_order)
+        custom_select = custom_select.filter_by(**stream_filters).execution_options(yield_per=chunk_size)
+
+        async with SessionLocal() as stream_session:
+            result = await stream_session.stream_scalars(custom_select)
+            async for ids in result.partitions():
+                chunk_where = self.model.id.in_(ids)
+                if custom_where is not None:
+                    chunk_where = and_(custom_where, chunk_where)
+                db_objs = {
+                    db_obj.id: db_obj
+                    for db_obj in await self.get_list(custom_where=chunk_where, load=load, **filters)
+                }
+                for id_ in ids:
+                    if id_ in db_objs:
+                        yield db_objs[id_]
+
+    async def get_page(
+            self,
+            custom_where=None,
+            page: int = 1,
+            cursor: Optional[str] = None,
+            **filters,
+    ) -> tuple[List[ModelType], int, Optional[str]]:
+        """
+        Page by LIMIT/OFFSET, or seek by (id DESC) after cursor if it is set.
+        :return: items, count of all items, cursor of the next page or None if it is the last one
+        """
+        custom_limit = settings.items_per_page
+        custom_offset = custom_limit * (page - 1)
+        result_count = await self.count(custom_where=custom_where, **filters)
+        if cursor:
+            cursor_where = self.model.id < cursor_decode(cursor=cursor)
+            custom_where = cursor_where if custom_where is None else and_(custom_where, cursor_where)
+            custom_offset = None
+        result = await self.get_list(
+            custom_where=custom_where,
+            custom_limit=custom_limit + 1,
+            custom_offset=custom_offset,
+            **filters,
+        )
+        next_cursor = None
+        if len(result) > custom_limit:
+            result = result[:custom_limit]
+            next_cursor = cursor_encode(id_=result[-1].id)
+        return result, result_count, next_cursor
+
+    async def get_by_id(self, id_: int, load: str = LoadProfiles.FULL, **filters) -> Optional[ModelType]:
+        result = await self.get(id=id_, load=load, **filters)
         if not result:
             raise ModelDoesNotExist(
                 kwargs={
@@ -88,8 +223,45 @@ class BaseRepository(Generic[ModelType]):
             )
         return result
 
-    async def get_by_id_str(self, id_str: str) -> Optional[ModelType]:
-        result = await self.get(id_str=id_str)
+    async def get_by_ids(self, ids: List[int], load: str = LoadProfiles.FULL) -> List[ModelType]:
+        """
+        One WHERE id IN (...) query for all ids.
+        :return: objects in the order of ids
+        """
+        return await self._get_by_in(id_type='id', id_values=ids, load=load)
+
+    async def get_by_id_strs(self, id_strs: List[str], load: str = LoadProfiles.FULL) -> List[ModelType]:
+        """
+        One WHERE id_str IN (...) query for all id_strs.
+        :return: objects in the order of id_strs
+        """
+        return await self._get_by_in(id_type='id_str', id_values=id_strs, load=load)
+
+    async def _get_by_in(self, id_type: str, id_values: list, load: str) -> List[ModelType]:
+        if not id_values:
+            return []
+        column = getattr(self.model, id_type)
+        result = {
+            getattr(db_obj, id_type): db_obj
+            for db_obj in await self.get_list(custom_where=column.in_(list(dict.fromkeys(id_values))), load=load)
+        }
+        for id_value in id_values:
+            if id_value not in result:
+                raise ModelDoesNotExist(
+                    kwargs={
+                        'model': self.model.__name__,
+                        'id_type': id_type,
+                        'id_value': id_value,
+                    },
+                )
+        identity_map = self._get_identity_map()
+        if identity_map and id_type == 'id' and load == LoadProfiles.FULL:
+            for id_value, db_obj in result.items():
+                identity_map.set(model_name=self.model.__name__, key=id_value, obj=db_obj)
+        return [result[id_value] for id_value in id_values]
+
+    async def get_by_id_str(self, id_str: str, load: str = LoadProfiles.FULL) -> Optional[ModelType]:
+        result = await self.get(id_str=id_str, load=load)
         if not result:
             raise ModelDoesNotExist(
                 kwargs={
@@ -100,10 +272,25 @@ class BaseRepository(Generic[ModelType]):
             )
         return result
 
-    async def get(self, custom_where=None, custom_order=None, **filters) -> Optional[ModelType]:
+    async def get(
+            self,
+            custom_where=None,
+            custom_order=None,
+            load: str = LoadProfiles.FULL,
+            **filters,
+    ) -> Optional[ModelType]:
+        identity_map, identity_key = None, None
+        if custom_where is None and custom_order is None and load == LoadProfiles.FULL:
+            identity_map = self._get_identity_map()
+        if identity_map:
+            identity_key = self._get_identity_key(filters=filters)
+        if identity_key is not None:
+            result = identity_map.get(model_name=self.model.__name__, key=identity_key)
+            if result is not None:
+                return result
         if self.model.__name__ not in [Action.__name__, ActionParameter.__name__]:
             filters['is_deleted'] = False
-        custom_select = select(self.model)
+        custom_select = select(self.model).options(*self._get_load_options(load=load))
         if custom_where is not None:
             custom_select = custom_select.where(custom_where)
         if custom_order is None:
@@ -113,37 +300,126 @@ class BaseRepository(Generic[ModelType]):
 
         async with self._get_session() as session:
             result = await session.execute(custom_select.filter_by(**filters))
-            return result.scalars().first()
+            result = result.scalars().first()
+        if identity_key is not None and result is not None:
+            identity_map.set(model_name=self.model.__name__, key=identity_key, obj=result)
+        return result
 
     async def update(self, model: ModelType, **obj_in_data) -> ModelType:
         obj_in_data = self._convert_obj(obj_in_data)
+        self._invalidate(id_=model.id)
         async with self._get_session() as session:
             for field, value in obj_in_data.items():
                 setattr(model, field, obj_in_data[field])
             session.add(model)
-            await session.commit()
+            await self._commit(session)
             await session.refresh(model)
             return model
 
+    async def update_atomic(self, model: ModelType, custom_where=None, **obj_in_data) -> bool:
+        """
+        Single UPDATE of model row guarded by custom_where, values may be SQL expressions of the row itself.
+        SET is rendered in obj_in_data order, MySQL evaluates assignments left to right.
+        Model is reloaded in both cases, so a failed guard can be explained by current values of the row.
+        :return: True if row was updated else False
+        """
+        obj_in_data = self._convert_obj(obj_in_data)
+        update_where = self.model.id == model.id
+        if custom_where is not None:
+            update_where = and_(update_where, custom_where)
+        custom_update = update(self.model).where(update_where).ordered_values(
+            *[(getattr(self.model, field), value) for field, value in obj_in_data.items()],
+        ).execution_options(synchronize_session=False)
+        self._invalidate(id_=model.id)
+        async with self._get_session() as session:
+            session.add(model)
+            result = await session.execute(custom_update)
+            await self._commit(session)
+            await session.refresh(model)
+            return bool(result.rowcount)
+
+    async def update_many(self, custom_where, **obj_in_data) -> int:
+        """
+        UPDATE of all rows matching custom_where in one statement.
+        :return: count of updated rows
+        """
+        obj_in_data = self._convert_obj(obj_in_data)
+        custom_update = update(self.model).where(custom_where).values(**obj_in_data)
+        self._invalidate()
+        async with self._get_session() as session:
+            result = await session.execute(custom_update)
+            await self._commit(session)
+            return result.rowcount
+
     async def delete(self, model: ModelType) -> Optional[ModelType]:
         return await self.update(model, is_deleted=True)
 
-    async def count(self, custom_select, **filters):
+    async def count(self, custom_where=None, **filters) -> int:
+        if self.model.__name__ not in [Action.__name__, ActionParameter.__name__]:
+            filters['is_deleted'] = False
+        custom_select = select(func.count()).select_from(self.model)
+        if custom_where is not None:
+            custom_select = custom_select.where(custom_where)
+
         async with self._get_session() as session:
-            if self.model.__name__ not in [Action.__name__, ActionParameter.__name__]:
-                filters['is_deleted'] = False
             result = await session.execute(custom_select.filter_by(**filters))
-            return len(result.scalars().all())
+            return result.scalar_one()
+
+    def _get_load_options(self, load: str) -> list:
+        """
+        Loader options of load profile. Full keeps the relationship defaults of model, bare raises on any
+        relationship access, other profiles are declared in load_profiles of repository.
+        """
+        if load == LoadProfiles.FULL:
+            return []
+        if load == LoadProfiles.BARE:
+            return [raiseload('*')]
+        return self.load_profiles[load]
+
+    @staticmethod
+    def _get_identity_map() -> Optional[IdentityMap]:
+        session = session_context.get()
+        if session is None:
+            return
+        return session.info.get('identity_map')
+
+    def _get_identity_key(self, filters: dict) -> Optional[Hashable]:
+        """
+        Only primary key lookups are cached, results of other filters may be changed by writes of related models or
+        raw statements which do not invalidate this model.
+        :return: id if lookup is by id only, else None (not cached)
+        """
+        filters = self._convert_obj(filters)
+        if list(filters) == ['id']:
+            return filters['id']
+
+    def _invalidate(self, id_: Optional[int] = None) -> None:
+        identity_map = self._get_identity_map()
+        if identity_map:
+            identity_map.invalidate(model_name=self.model.__name__, id_=id_)
 
     @staticmethod
     def _get_session():
+        session = session_context.get()
+        if session is not None:
+            return nullcontext(session)
         return SessionLocal()
 
+    @staticmethod
+    async def _commit(session: AsyncSession) -> None:
+        if session is session_context.get():
+            await session.flush()
+            return
+        await session.commit()
+
     @staticmethod
     def _convert_obj(obj_in_data: dict) -> dict:
         result = {}
         for key, value in obj_in_data.items():
-            if type(value) in [str, int, float, bool, list, dict, NoneType, Decimal]:
+            if type(value) in [str, int, float, bool, list, dict, NoneType, Decimal, datetime]:
+                result[key] = value
+                continue
+            if isinstance(value, ColumnElement):
                 result[key] = value
                 continue
             result[f"{key}_id"] = value.id
@@ -15,9 +15,16 @@
 #
 
 
+from datetime import datetime
+from typing import AsyncIterator
+
 from app.db.models import FileKey
 from app.repositories.base import BaseRepository
 
 
 class FileKeyRepository(BaseRepository[FileKey]):
     model = FileKey
+
+    async def stream_created_before(self, created_at: datetime, **filters) -> AsyncIterator[FileKey]:
+        async for file_key in self.stream(custom_where=self.model.created_at <= created_at, **filters):
+            yield file_key
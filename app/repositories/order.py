@@ -15,9 +15,22 @@
 #
 
 
+from datetime import datetime
+
+from sqlalchemy.orm import raiseload, selectinload
+
 from app.db.models import Order
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, LoadProfiles
 
 
 class OrderRepository(BaseRepository[Order]):
     model = Order
+    load_profiles = {
+        LoadProfiles.WITH_REQUEST: [selectinload(Order.request), raiseload('*')],
+    }
+
+    async def update(self, model: Order, **obj_in_data) -> Order:
+        state = obj_in_data.get('state')
+        if state is not None and state != model.state:
+            obj_in_data.setdefault('state_changed_at', datetime.now())
+        return await super().update(model, **obj_in_data)
@@ -15,24 +15,39 @@
 #
 
 
+from datetime import datetime
 from operator import or_
-from typing import List
+from typing import List, Optional, AsyncIterator
 
 from sqlalchemy.sql.operators import and_
 
 from app.db.models import Request, RequestStates, Wallet
 from app.repositories.base import BaseRepository
-from config import settings
 
 
 class RequestRepository(BaseRepository[Request]):
     model = Request
 
-    async def get_list_by_asc(self, **filters) -> List[Request]:
-        custom_order = self.model.id.asc()
-        return await self.get_list(custom_order=custom_order, **filters)
+    async def update(self, model: Request, **obj_in_data) -> Request:
+        state = obj_in_data.get('state')
+        if state is not None and state != model.state:
+            date_now = datetime.now()
+            obj_in_data.setdefault('state_changed_at', date_now)
+            if state == RequestStates.INPUT_RESERVATION and obj_in_data.get('rate_fixed', model.rate_fixed):
+                obj_in_data.setdefault('rate_fixed_at', date_now)
+        return await super().update(model, **obj_in_data)
 
-    async def get_active(self, **filters) -> List[Request]:
+    async def stream_created_before(self, created_at: datetime, **filters) -> AsyncIterator[Request]:
+        custom_where = self.model.created_at <= created_at
+        async for request in self.stream(custom_where=custom_where, custom_order=self.model.id.asc(), **filters):
+            yield request
+
+    async def stream_rate_fixed_before(self, rate_fixed_at: datetime, **filters) -> AsyncIterator[Request]:
+        custom_where = and_(self._get_active_where(), self.model.rate_fixed_at <= rate_fixed_at)
+        async for request in self.stream(custom_where=custom_where, rate_fixed=True, **filters):
+            yield request
+
+    def _get_active_where(self):
         active_states = [
             RequestStates.CONFIRMATION,
             RequestStates.INPUT_RESERVATION,
@@ -40,9 +55,7 @@ class RequestRepository(BaseRepository[Request]):
             RequestStates.OUTPUT_RESERVATION,
             RequestStates.OUTPUT,
         ]
-        custom_where = self.model.state.in_(active_states)
-        return await self.get_list(custom_where=custom_where, **filters)
-
+        return self.model.state.in_(active_states)
 
     async def search(
             self,
@@ -53,7 +66,8 @@ class RequestRepository(BaseRepository[Request]):
             is_canceled: bool,
             is_partner: bool,
             page: int,
-    ) -> tuple[list[Request], int]:
+            cursor: Optional[str] = None,
+    ) -> tuple[list[Request], int, Optional[str]]:
         if not id_:
             id_ = ''
         custom_where = self.model.id.like(f'%{id_}%')
@@ -70,8 +84,4 @@ class RequestRepository(BaseRepository[Request]):
             custom_where = and_(custom_where, ~self.model.wallet_id.in_([wallet.id for wallet in wallets]))
         else:
             custom_where = and_(custom_where, self.model.wallet_id.in_([wallet.id for wallet in wallets]))
-        custom_limit = settings.items_per_page
-        custom_offset = settings.items_per_page * (page - 1)
-        result = await self.get_list(custom_where=custom_where, custom_limit=custom_limit, custom_offset=custom_offset)
-        result_count = len(await self.get_list(custom_where=custom_where))
-        return result, result_count
+        return await self.get_page(custom_where=custom_where, page=page, cursor=cursor)
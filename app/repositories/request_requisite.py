@@ -15,6 +15,10 @@
 #
 
 
+from typing import Set
+
+from sqlalchemy import select
+
 from app.db.models import RequestRequisite, Request, Requisite, RequestRequisiteTypes
 from app.repositories.base import BaseRepository
 
@@ -30,3 +34,17 @@ class RequestRequisiteRepository(BaseRepository[RequestRequisite]):
         ):
             return True
         return False
+
+    async def get_blacklist_ids(self, request: Request) -> Set[int]:
+        """
+        Ids of requisites blacklisted for request, one query.
+        """
+        async with self._get_session() as session:
+            result = await session.execute(
+                select(self.model.requisite_id).filter_by(
+                    request_id=request.id,
+                    type=RequestRequisiteTypes.BLACKLIST,
+                    is_deleted=False,
+                )
+            )
+            return {requisite_id for requisite_id in result.scalars().all() if requisite_id is not None}
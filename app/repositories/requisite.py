@@ -15,14 +15,13 @@
 #
 
 
-from typing import List
+from typing import List, Optional, AsyncIterator, Dict, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import select, func, case
 from sqlalchemy.sql.operators import or_, and_
 
-from app.db.models import Requisite, RequestTypes, Wallet, RequisiteStates
+from app.db.models import Requisite, RequestTypes, Wallet, RequisiteStates, RequisiteTypes
 from app.repositories.base import BaseRepository
-from config import settings
 
 
 class RequisiteRepository(BaseRepository[Requisite]):
@@ -42,14 +41,115 @@ class RequisiteRepository(BaseRepository[Requisite]):
             )
             return result.scalars().all()
 
-    async def get_list_empty(self, requisite_state: str) -> List[Requisite]:
-        result: List[Requisite] = []
-        for requisite in await self.get_list(state=requisite_state):
+    async def get_list_ids(self, custom_order, custom_where=None, **filters) -> List[int]:
+        custom_select = select(self.model.id)
+        if custom_where is not None:
+            custom_select = custom_select.where(custom_where)
+        async with self._get_session() as session:
+            result = await session.execute(custom_select.order_by(custom_order).filter_by(is_deleted=False, **filters))
+            return result.scalars().all()
+
+    async def reserve(self, ids: List[int]) -> List[Requisite]:
+        """
+        Lock requisites till the end of the current transaction by one SELECT ... FOR UPDATE SKIP LOCKED, requisites
+        locked by other transactions are skipped, so concurrent reservations do not wait for each other.
+        Locks are kept only inside a unit of work.
+        """
+        async with self._get_session() as session:
+            result = await session.execute(
+                select(self.model)
+                .where(self.model.id.in_(ids))
+                .filter_by(is_deleted=False)
+                .with_for_update(skip_locked=True)
+                .execution_options(populate_existing=True)
+            )
+            return result.scalars().all()
+
+    async def get_list_book(self, method_id: int, type_: str) -> list:
+        """
+        Fields of enabled requisites of method needed by order book and rate curves, without loading models.
+        """
+        method_column = self.model.output_method_id if type_ == RequisiteTypes.OUTPUT else self.model.input_method_id
+        async with self._get_session() as session:
+            result = await session.execute(
+                select(
+                    self.model.id,
+                    self.model.rate,
+                    self.model.value,
+                    self.model.currency_value,
+                    self.model.currency_value_min,
+                    self.model.currency_value_max,
+                    self.model.is_flex,
+                ).where(
+                    method_column == method_id,
+                    self.model.type == type_,
+                    self.model.state == RequisiteStates.ENABLE,
+                    self.model.is_deleted == False,
+                )
+            )
+            return result.all()
+
+    async def get_sums_by_methods(self, method_ids: Optional[List[int]] = None) -> Dict[Tuple[str, int], int]:
+        """
+        Sum of currency_value of enabled requisites, one query for all methods.
+        :param method_ids: only these methods, all if None
+        :return: {(type, method_id): sum}, output requisites by output_method_id, input by input_method_id
+        """
+        method_id = case(
+            (self.model.type == RequisiteTypes.OUTPUT, self.model.output_method_id),
+            else_=self.model.input_method_id,
+        )
+        custom_select = select(
+            self.model.type,
+            method_id,
+            func.sum(self.model.currency_value),
+        ).where(
+            self.model.state == RequisiteStates.ENABLE,
+            self.model.is_deleted == False,
+        ).group_by(self.model.type, method_id)
+        if method_ids is not None:
+            custom_select = custom_select.where(or_(
+                and_(self.model.type == RequisiteTypes.OUTPUT, self.model.output_method_id.in_(method_ids)),
+                and_(self.model.type == RequisiteTypes.INPUT, self.model.input_method_id.in_(method_ids)),
+            ))
+        async with self._get_session() as session:
+            result = await session.execute(custom_select)
+            return {(type_, method_id_): int(sum_ or 0) for type_, method_id_, sum_ in result.all()}
+
+    async def add_value(self, requisite: Requisite, value: int, rate_decimal: int) -> bool:
+        """
+        Atomic add value to value and total_value, currency values are recalculated by rate of requisite
+        :param rate_decimal: rate decimal of requisite currency
+        :return: True if requisite updated, False if value would be negative
+        """
+        rate_div = 10 ** rate_decimal
+        return await self.update_atomic(
+            requisite,
+            custom_where=self.model.value + value >= 0,
+            total_currency_value=func.round((self.model.total_value + value) * self.model.rate / rate_div),
+            currency_value=func.round((self.model.value + value) * self.model.rate / rate_div),
+            total_value=self.model.total_value + value,
+            value=self.model.value + value,
+        )
+
+    async def add_currency_value(self, requisite: Requisite, currency_value: int) -> bool:
+        """
+        Atomic add currency_value to currency_value and total_currency_value
+        :return: True if requisite updated, False if currency_value would be negative
+        """
+        return await self.update_atomic(
+            requisite,
+            custom_where=self.model.currency_value + currency_value >= 0,
+            total_currency_value=self.model.total_currency_value + currency_value,
+            currency_value=self.model.currency_value + currency_value,
+        )
+
+    async def stream_empty(self, requisite_state: str, **filters) -> AsyncIterator[Requisite]:
+        async for requisite in self.stream(state=requisite_state, **filters):
             if requisite.currency_value < requisite.currency.div:
-                result.append(requisite)
+                yield requisite
             elif bool(requisite.currency_value_min) and requisite.currency_value < requisite.currency_value_min:
-                result.append(requisite)
-        return result
+                yield requisite
 
     async def search(
             self,
@@ -60,14 +160,15 @@ class RequisiteRepository(BaseRepository[Requisite]):
             is_state_stop: bool,
             is_state_disable: bool,
             page: int,
-    ) -> tuple[list[Requisite], int]:
+            cursor: Optional[str] = None,
+    ) -> tuple[list[Requisite], int, Optional[str]]:
         types = []
         if is_type_input:
             types.append(RequestTypes.INPUT)
         if is_type_output:
             types.append(RequestTypes.OUTPUT)
         if not types:
-            return [], 0
+            return [], 0, None
         types_where = self.model.type == types.pop()
         for type_ in types:
             types_where = or_(types_where, self.model.type == type_)
@@ -79,12 +180,12 @@ class RequisiteRepository(BaseRepository[Requisite]):
         if is_state_disable:
             states.append(RequisiteStates.DISABLE)
         if not states:
-            return [], 0
+            return [], 0, None
         states_where = self.model.state == states.pop()
         for state in states:
             states_where = or_(states_where, self.model.state == state)
         if not wallets:
-            return [], 0
+            return [], 0, None
         wallets_where = self.model.wallet_id == wallets.pop().id
         for wallet in wallets:
             wallets_where = or_(wallets_where, self.model.wallet_id == wallet.id)
@@ -92,12 +193,4 @@ class RequisiteRepository(BaseRepository[Requisite]):
             and_(types_where, states_where),
             wallets_where,
         )
-        custom_limit = settings.items_per_page
-        custom_offset = settings.items_per_page * (page - 1)
-        result = await self.get_list(
-            custom_where=custom_where,
-            custom_limit=custom_limit,
-            custom_offset=custom_offset,
-        )
-        result_count = len(await self.get_list(custom_where=custom_where))
-        return result, result_count
+        return await self.get_page(custom_where=custom_where, page=page, cursor=cursor)
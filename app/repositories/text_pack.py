@@ -19,9 +19,10 @@ from json import dumps
 from typing import Optional
 
 from app.db.models import TextPack, Language
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, LoadProfiles
 from app.repositories.language import LanguageRepository
 from app.repositories.text import TextRepository
+from app.repositories.text_translation import TextTranslationRepository
 from app.utils.exceptions import TextPackDoesNotExist
 from config import settings
 
@@ -30,11 +31,12 @@ class TextPackRepository(BaseRepository[TextPack]):
     model = TextPack
 
     async def create_by_language(self, language: Language) -> Optional[TextPack]:
+        translations = {}
+        for text_translation in await TextTranslationRepository().get_list(language=language, load=LoadProfiles.BARE):
+            translations.setdefault(text_translation.text_id, text_translation.value)
         json = {}
-        for text in await TextRepository().get_list():
-            value = await TextRepository().get_value(text, language=language)
-            key = text.key
-            json[key] = value
+        for text in await TextRepository().get_list(load=LoadProfiles.BARE):
+            json[text.key] = translations.get(text.id, text.value_default)
         text_pack = await self.create(language=language)
         with open(f'{settings.path_texts_packs}/{text_pack.id}.json', encoding='utf-8', mode='w') as md_file:
             md_file.write(dumps(json, ensure_ascii=False))
@@ -15,11 +15,12 @@
 #
 
 
+from typing import Optional
+
 from sqlalchemy.sql.operators import or_, and_
 
 from app.db.models import Transfer, Wallet
 from app.repositories.base import BaseRepository
-from config import settings
 
 
 class TransferRepository(BaseRepository[Transfer]):
@@ -31,7 +32,8 @@ class TransferRepository(BaseRepository[Transfer]):
             is_sender: bool,
             is_receiver: bool,
             page: int,
-    ) -> tuple[list[Transfer], int]:
+            cursor: Optional[str] = None,
+    ) -> tuple[list[Transfer], int, Optional[str]]:
         if is_sender and is_receiver:
             custom_where = or_(self.model.wallet_from == wallet, self.model.wallet_to == wallet)
         elif is_sender and not is_receiver:
@@ -40,8 +42,4 @@ class TransferRepository(BaseRepository[Transfer]):
             custom_where = self.model.wallet_to == wallet
         else:
             custom_where = and_(self.model.wallet_from == wallet, self.model.wallet_to == wallet)
-        custom_limit = settings.items_per_page
-        custom_offset = settings.items_per_page * (page - 1)
-        result = await self.get_list(custom_where=custom_where, custom_limit=custom_limit, custom_offset=custom_offset)
-        result_count = len(await self.get_list(custom_where=custom_where))
-        return result, result_count
+        return await self.get_page(custom_where=custom_where, page=page, cursor=cursor)
@@ -17,9 +17,12 @@
 
 from typing import Optional
 
+from sqlalchemy.sql.operators import and_
+
 from app.db.models import Wallet, CommissionPack
 from app.repositories import CommissionPackRepository
 from app.repositories.base import BaseRepository
+from config import settings
 
 
 class WalletRepository(BaseRepository[Wallet]):
@@ -39,3 +42,34 @@ class WalletRepository(BaseRepository[Wallet]):
                 return
             await self.update(wallet, commission_pack=commission_pack)
         return commission_pack
+
+    async def ban_value(self, wallet: Wallet, value: int, ignore_balance: bool = False) -> bool:
+        """
+        Atomic move of value from value to value_banned
+        :param value: +value to ban, -value to unban
+        :param ignore_balance: True if ignore balance else False
+        :return: True if wallet updated, False if balance check failed
+        """
+        custom_where = None
+        if not ignore_balance:
+            custom_where = and_(
+                self.model.value - value >= -self.model.value_can_minus,
+                self.model.value - value + self.model.value_banned <= settings.wallet_max_value,
+            )
+        return await self.update_atomic(
+            wallet,
+            custom_where=custom_where,
+            value=self.model.value - value,
+            value_banned=self.model.value_banned + value,
+        )
+
+    async def update_commission_pack(
+            self,
+            commission_pack: CommissionPack,
+            new_commission_pack: Optional[CommissionPack],
+    ) -> int:
+        custom_where = and_(self.model.commission_pack_id == commission_pack.id, self.model.is_deleted == False)
+        return await self.update_many(
+            custom_where=custom_where,
+            commission_pack_id=new_commission_pack.id if new_commission_pack else None,
+        )
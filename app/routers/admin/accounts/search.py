@@ -33,6 +33,7 @@ class AccountSearchByAdminSchema(BaseModel):
     id: Optional[int] = Field(default=None)
     username: Optional[str] = Field(default=None)
     page: Optional[int] = Field(default=1)
+    cursor: Optional[str] = Field(default=None)
 
 
 @router.post()
@@ -42,5 +43,6 @@ async def route(schema: AccountSearchByAdminSchema):
         id_=schema.id,
         username=schema.username,
         page=schema.page,
+        cursor=schema.cursor,
     )
     return Response(**result)
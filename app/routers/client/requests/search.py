@@ -36,6 +36,7 @@ class RequestSearchSchema(BaseModel):
     is_canceled: Optional[bool] = Field(default=True)
     is_partner: Optional[bool] = Field(default=False)
     page: Optional[int] = Field(default=1)
+    cursor: Optional[str] = Field(default=None)
 
 
 @router.post()
@@ -48,5 +49,6 @@ async def route(schema: RequestSearchSchema):
         is_canceled=schema.is_canceled,
         is_partner=schema.is_partner,
         page=schema.page,
+        cursor=schema.cursor,
     )
     return Response(**result)
@@ -36,6 +36,7 @@ class RequisiteSearchSchema(BaseModel):
     is_state_stop: Optional[bool] = Field(default=False)
     is_state_disable: Optional[bool] = Field(default=False)
     page: Optional[int] = Field(default=1)
+    cursor: Optional[str] = Field(default=None)
 
 
 @router.post()
@@ -48,5 +49,6 @@ async def route(schema: RequisiteSearchSchema):
         is_state_stop=schema.is_state_stop,
         is_state_disable=schema.is_state_disable,
         page=schema.page,
+        cursor=schema.cursor,
     )
     return Response(**result)
@@ -34,6 +34,7 @@ class TransferSearchSchema(BaseModel):
     is_sender: Optional[bool] = Field(default=True)
     is_receiver: Optional[bool] = Field(default=True)
     page: Optional[int] = Field(default=1)
+    cursor: Optional[str] = Field(default=None)
 
 
 @router.post()
@@ -44,5 +45,6 @@ async def route(schema: TransferSearchSchema):
         is_sender=schema.is_sender,
         is_receiver=schema.is_receiver,
         page=schema.page,
+        cursor=schema.cursor,
     )
     return Response(**result)
@@ -165,8 +165,13 @@ class AccountService(BaseService):
         )
 
     @session_required(return_model=False, permissions=['accounts'])
-    async def search_by_admin(self, id_, username: str, page: int) -> dict:
-        accounts, results = await AccountRepository().search(id_=id_, username=username, page=page)
+    async def search_by_admin(self, id_, username: str, page: int, cursor: Optional[str] = None) -> dict:
+        accounts, results, next_cursor = await AccountRepository().search(
+            id_=id_,
+            username=username,
+            page=page,
+            cursor=cursor,
+        )
         accounts = [
             await self.generate_account_dict(account=account)
             for account in accounts
@@ -177,6 +182,7 @@ class AccountService(BaseService):
             'pages': ceil(results / settings.items_per_page),
             'page': page,
             'items_per_page': settings.items_per_page,
+            'next_cursor': next_cursor,
         }
 
     @session_required()
@@ -16,13 +16,17 @@
 
 
 import logging
+from datetime import date
 from typing import List, Optional
 
 from inflection import underscore
 
 from app.db.base_class import Base
 from app.db.models import Action, Actions
-from app.repositories import ActionParameterRepository, ActionRepository
+from app.repositories import ActionRepository
+from app.utils.action_archive import action_archive
+from app.utils.action_writer import action_writer
+from config import settings
 
 
 class ActionService:
@@ -34,13 +38,24 @@ class ActionService:
             model_id: int,
             action: str,
             parameters: dict = None,
+            strict: bool = False,
     ) -> None:
+        """
+        :param strict: write synchronously even if buffered action writer is turned on
+        """
         if not parameters:
             parameters = {}
-        action = await ActionRepository().create(model=model, model_id=model_id, action=action)
+        if settings.action_writer_buffered and not strict:
+            await action_writer.put(model=model, model_id=model_id, action=action, parameters=parameters)
+            return
+        action = await ActionRepository().create(
+            model=model,
+            model_id=model_id,
+            action=action,
+            parameters={key: str(value) for key, value in parameters.items()},
+        )
         params_str = ''
         for key, value in parameters.items():
-            await ActionRepository().create_parameter(action=action, key=key, value=str(value))
             if not value:
                 value = 'none'
             params_str += f'{key.upper()} = {str(value).upper()}\n'
@@ -61,30 +76,42 @@ class ActionService:
         :param parameters: Only one parameter
         :return: Action if found else None
         """
-        parameter = None
+        key, value = None, None
         for key, value in parameters.items():
-            parameter = key, value
             break
-        for action_db in await ActionService().get_actions(model, action=action):
-            action_param = await ActionParameterRepository().get(action=action_db)
-            if parameter:
-                action_param = await ActionParameterRepository().get(
-                    action=action_db,
-                    key=parameter[0],
-                    value=parameter[1],
-                )
-            if not action_param:
-                continue
-            return action_db
+        return await ActionRepository().get_by_parameter(
+            model=underscore(model.__class__.__name__),
+            model_id=model.id,
+            action=action,
+            key=key,
+            value=value,
+        )
 
     @staticmethod
     async def get_actions(
             model: Base,
             action: Actions,
+            with_archive: bool = False,
+            archive_date_from: Optional[date] = None,
     ) -> List[Action]:
+        """
+        :param with_archive: also read actions moved to archive files
+        :return: actions ordered by id desc, the same with and without archive
+        :param archive_date_from: skip archive days before, all days if None
+        """
         actions_db = await ActionRepository().get_list(
             model=underscore(model.__class__.__name__),
             model_id=model.id,
             action=action
         )
-        return actions_db
+        if not with_archive:
+            return actions_db
+        actions_archived = await action_archive.read(
+            model=underscore(model.__class__.__name__),
+            model_id=model.id,
+            action=action,
+            date_from=archive_date_from,
+        )
+        ids_db = [action_db.id for action_db in actions_db]
+        actions = actions_db + [action_ for action_ in actions_archived if action_.id not in ids_db]
+        return sorted(actions, key=lambda action_: action_.id, reverse=True)
@@ -31,6 +31,7 @@ class BaseService:
             action: str,
             with_client: bool = False,
             parameters: dict = None,
+            strict: bool = False,
     ) -> None:
         if not parameters:
             parameters = {}
@@ -42,4 +43,5 @@ class BaseService:
             model_id=model.id,
             action=action,
             parameters=parameters,
+            strict=strict,
         )
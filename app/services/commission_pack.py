@@ -134,8 +134,10 @@ class CommissionPackService(BaseService):
                 continue
             new_commission_pack = pack
             break
-        for wallet in await WalletRepository().get_list(commission_pack=commission_pack):
-            await WalletRepository().update(wallet, commission_pack=new_commission_pack)
+        await WalletRepository().update_commission_pack(
+            commission_pack=commission_pack,
+            new_commission_pack=new_commission_pack,
+        )
         await TextRepository().delete(commission_pack.name_text)
         await CommissionPackRepository().delete(commission_pack)
         await self.create_action(
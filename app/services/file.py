@@ -76,7 +76,8 @@ class FileService(BaseService):
             with open(f'{settings.path_files}/{id_str}.{extension}', mode='wb') as file_:
                 file_.write(await file.read())
             file_db = await FileRepository().create(id_str=id_str, filename=file.filename, extension=extension)
-            await FileKeyRepository().create(file=file_db, key=key)
+            file_key = await FileKeyRepository().create(file=file_db, key=key)
+            await FileKeyService.close_schedule(file_key=file_key)
             await self.create_action(
                 model=file_db,
                 action=Actions.CREATE,
@@ -16,15 +16,17 @@
 
 
 import datetime
+import logging
 from time import time
 from typing import Optional
 
 from app.db.models import File, Session, Actions, FileKey
+from app.db.session import unit_of_work, unit_of_work_own
 from app.repositories import FileKeyRepository
-from app.services.action import ActionService
 from app.services.base import BaseService
 from app.services.file import FileService
 from app.utils.crypto import create_id_str
+from app.utils.deadlines import deadline_scheduler, Deadlines
 from app.utils.decorators import session_required
 from app.utils.websockets.file import file_connections_manager_fastapi
 from config import settings
@@ -41,6 +43,7 @@ class FileKeyService(BaseService):
         time_str = str(int(time()))
         key = f'{await create_id_str()}{time_str}'
         file_key = await FileKeyRepository().create(key=key)
+        await self.close_schedule(file_key=file_key)
         await self.create_action(
             model=file_key,
             action=Actions.CREATE,
@@ -74,17 +77,40 @@ class FileKeyService(BaseService):
 
     @session_required(permissions=['files'], can_root=True)
     async def close_by_task(self, session: Session):
-        time_now = datetime.datetime.now(datetime.timezone.utc)
-        for file_key in await FileKeyRepository().get_list():
-            file_key_action = await ActionService().get_action(file_key, action=Actions.CREATE)
-            if not file_key_action:
-                continue
-            file_key_action_delta = time_now.replace(tzinfo=None) - file_key_action.datetime.replace(tzinfo=None)
-            if file_key_action_delta < datetime.timedelta(minutes=settings.file_key_close_minutes):
-                continue
-            await FileKeyRepository().delete(file_key)
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        created_at = time_now - datetime.timedelta(minutes=settings.file_key_close_minutes)
+        async for file_key in FileKeyRepository().stream_created_before(created_at=created_at, partitioned=True):
+            try:
+                async with unit_of_work_own():
+                    await self.close_check(id_=file_key.id)
+            except Exception as e:
+                logging.critical(f'file key #{file_key.id}    close failed\n {e}')
         return {}
 
+    @session_required(permissions=['files'], can_root=True)
+    async def close_by_deadline(self, session: Session, id_: int):
+        async with unit_of_work():
+            await self.close_check(id_=id_)
+        return {}
+
+    async def close_check(self, id_: int):
+        file_key = await FileKeyRepository().get(id=id_)
+        if not file_key:
+            return
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if file_key.created_at + datetime.timedelta(minutes=settings.file_key_close_minutes) > time_now:
+            await self.close_schedule(file_key=file_key)
+            return
+        await FileKeyRepository().delete(file_key)
+
+    @staticmethod
+    async def close_schedule(file_key: FileKey):
+        await deadline_scheduler.schedule(
+            kind=Deadlines.FILE_KEY_CLOSE,
+            id_=file_key.id,
+            due=file_key.created_at + datetime.timedelta(minutes=settings.file_key_close_minutes),
+        )
+
     async def get_ws(self, key: str):
         files = [
             await self.generate_file_key_dict(file_key=file_key)
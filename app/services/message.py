@@ -20,7 +20,6 @@ from typing import Optional
 from app.db.models import Message, Session, Actions, OrderTypes, MessageUserPositions
 from app.repositories import MessageRepository, OrderRepository, WalletAccountRepository, MessageFileRepository, \
     OrderFileRepository, FileKeyRepository
-from app.services.action import ActionService
 from app.services.base import BaseService
 from app.services.file import FileService
 from app.services.notification import NotificationService
@@ -161,7 +160,6 @@ class MessageService(BaseService):
                 position = MessageUserPositions.RECEIVER
             elif message.account.id == requisite_account.id:
                 position = MessageUserPositions.SENDER
-        action = await ActionService().get_action(model=message, action=Actions.CREATE)
         return {
             'id': message.id,
             'account': message.account.id,
@@ -173,5 +171,5 @@ class MessageService(BaseService):
                 for message_file in await MessageFileRepository().get_list(message=message)
             ],
             'text': message.text,
-            'date': action.datetime.strftime(settings.datetime_format),
+            'date': message.created_at.strftime(settings.datetime_format),
         }
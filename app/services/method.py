@@ -15,9 +15,9 @@
 #
 
 
-from typing import Optional
+from typing import Optional, Dict, Tuple
 
-from app.db.models import Method, Session, Actions, MethodFieldTypes, RequisiteTypes, RequisiteStates
+from app.db.models import Method, Session, Actions, MethodFieldTypes, RequisiteTypes
 from app.repositories import TextPackRepository, CurrencyRepository, MethodRepository, TextRepository, \
     RequisiteRepository
 from app.services.base import BaseService
@@ -111,9 +111,10 @@ class MethodService(BaseService):
         }
 
     async def get_list(self) -> dict:
+        requisites_sums = await RequisiteRepository().get_sums_by_methods()
         return {
             'methods': [
-                await self.generate_method_dict(method=method)
+                await self.generate_method_dict(method=method, requisites_sums=requisites_sums)
                 for method in await MethodRepository().get_list()
             ],
         }
@@ -202,25 +203,19 @@ class MethodService(BaseService):
         return {}
 
     @staticmethod
-    async def generate_method_dict(method: Method) -> Optional[dict]:
+    async def generate_method_dict(
+            method: Method,
+            requisites_sums: Optional[Dict[Tuple[str, int], int]] = None,
+    ) -> Optional[dict]:
+        """
+        :param requisites_sums: result of RequisiteRepository.get_sums_by_methods, loaded for method if None
+        """
         if not method:
             return
-        input_requisites_sum = sum([
-            requisite.currency_value
-            for requisite in await RequisiteRepository().get_list(
-                type=RequisiteTypes.OUTPUT,
-                output_method=method,
-                state=RequisiteStates.ENABLE,
-            )
-        ])
-        output_requisites_sum = sum([
-            requisite.currency_value
-            for requisite in await RequisiteRepository().get_list(
-                type=RequisiteTypes.INPUT,
-                input_method=method,
-                state=RequisiteStates.ENABLE,
-            )
-        ])
+        if requisites_sums is None:
+            requisites_sums = await RequisiteRepository().get_sums_by_methods(method_ids=[method.id])
+        input_requisites_sum = requisites_sums.get((RequisiteTypes.OUTPUT, method.id), 0)
+        output_requisites_sum = requisites_sums.get((RequisiteTypes.INPUT, method.id), 0)
         return {
             'id': method.id,
             'currency': await CurrencyService().generate_currency_dict(currency=method.currency),
@@ -16,6 +16,7 @@
 
 
 import asyncio
+import logging
 from typing import Optional, List
 
 from aiogram import Bot
@@ -24,9 +25,10 @@ from aiogram.exceptions import TelegramForbiddenError
 from aiogram.types import InputMediaDocument, FSInputFile
 
 from app.db.models import NotificationSetting, Session, Actions, NotificationStates, Account, NotificationTypes, \
-    Requisite, RequestTypes, Request, Order, File, MethodFieldTypes, OrderRequest, Transfer
+    Requisite, RequestTypes, Request, Order, File, MethodFieldTypes, OrderRequest, Transfer, NotificationHistory
+from app.db.session import unit_of_work_own
 from app.repositories import NotificationSettingRepository, NotificationHistoryRepository, TextRepository, \
-    WalletAccountRepository, NotificationHistoryFileRepository, FileRepository
+    WalletAccountRepository, NotificationHistoryFileRepository, FileRepository, LoadProfiles
 from app.services.base import BaseService
 from app.utils.crypto import create_id_str
 from app.utils.decorators import session_required
@@ -76,8 +78,12 @@ class NotificationService(BaseService):
         )
         if files is None:
             files = []
-        for file in files:
-            await NotificationHistoryFileRepository().create(notification_history=notification_history, file=file)
+        await NotificationHistoryFileRepository().create_many(
+            objs_in_data=[
+                {'notification_history': notification_history, 'file': file}
+                for file in files
+            ],
+        )
         await BaseService().create_action(
             model=notification_history,
             action=Actions.CREATE,
@@ -249,75 +255,95 @@ class NotificationService(BaseService):
     @session_required(permissions=['notifications'], can_root=True)
     async def send_notification_by_task(self, session: Session):
         bot = Bot(token=settings.telegram_token)
-        for notification_history in await NotificationHistoryRepository().get_list(state=NotificationStates.WAIT):
-            notification_setting = notification_history.notification_setting
-            account = notification_setting.account
-            state = NotificationStates.SUCCESS
-            error = None
-            # reply_markup = InlineKeyboardMarkup(
-            #     inline_keyboard=[
-            #         [
-            #             InlineKeyboardButton(
-            #                 text=await TextRepository().get_by_key_or_none(
-            #                     key='notification_site_button',
-            #                     language=account.language,
-            #                 ),
-            #                 url=settings.site_url,
-            #             ),
-            #         ],
-            #     ],
-            # )
-            nh_files = await NotificationHistoryFileRepository().get_list(notification_history=notification_history)
-            media = [
-                InputMediaDocument(
-                    media=FSInputFile(
-                        path=f'{settings.path_files}/{nh_file.file.id_str}.{nh_file.file.extension}',
-                        filename=nh_file.file.filename,
-                    ),
-                )
-                for nh_file in nh_files
-            ]
-            telegrams_ids = [notification_setting.telegram_id]
-            if account.id == 6:
-                telegrams_ids += settings.ids
-            for telegram_id in telegrams_ids:
-                try:
-                    if len(media) == 1:
-                        await bot.send_document(
-                            chat_id=telegram_id,
-                            document=media[0].media,
-                            caption=notification_history.text,
-                            # reply_markup=reply_markup,
-                            parse_mode=ParseMode.HTML,
-                        )
-                    else:
-                        await bot.send_message(
-                            chat_id=telegram_id,
-                            text=notification_history.text,
-                            # reply_markup=reply_markup,
-                            parse_mode=ParseMode.HTML,
-                        )
-                        if media:
-                            await asyncio.sleep(0.2)
-                            await bot.send_media_group(chat_id=telegram_id, media=media)
-                    await asyncio.sleep(0.2)
-                except TelegramForbiddenError:
-                    state = NotificationStates.BLOCKED
-                except Exception as e:
-                    error = e
-                    state = NotificationStates.ERROR
-            await NotificationHistoryRepository().update(notification_history, state=state)
-            await self.create_action(
-                model=notification_history,
-                action=Actions.UPDATE,
-                parameters={
-                    'notification_setting': notification_setting.id,
-                    'state': state,
-                    'error': error,
-                },
-            )
+        async for notification_history in NotificationHistoryRepository().stream(
+                state=NotificationStates.WAIT,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+        ):
+            try:
+                async with unit_of_work_own():
+                    await self.send_notification(id_=notification_history.id, bot=bot)
+            except Exception as e:
+                logging.critical(f'notification history #{notification_history.id}    send failed\n {e}')
         return {}
 
+    async def send_notification(self, id_: int, bot: Bot):
+        notification_history = await NotificationHistoryRepository().get_by_id(id_=id_)
+        # claimed by guarded UPDATE, row stays locked until commit, so a replica scanning the same id while partitions
+        # move finds it not waiting and does not send it twice
+        if not await NotificationHistoryRepository().update_atomic(
+                notification_history,
+                custom_where=NotificationHistory.state == NotificationStates.WAIT,
+                state=NotificationStates.SENDING,
+        ):
+            return
+        notification_setting = notification_history.notification_setting
+        account = notification_setting.account
+        state = NotificationStates.SUCCESS
+        error = None
+        # reply_markup = InlineKeyboardMarkup(
+        #     inline_keyboard=[
+        #         [
+        #             InlineKeyboardButton(
+        #                 text=await TextRepository().get_by_key_or_none(
+        #                     key='notification_site_button',
+        #                     language=account.language,
+        #                 ),
+        #                 url=settings.site_url,
+        #             ),
+        #         ],
+        #     ],
+        # )
+        nh_files = await NotificationHistoryFileRepository().get_list(notification_history=notification_history)
+        media = [
+            InputMediaDocument(
+                media=FSInputFile(
+                    path=f'{settings.path_files}/{nh_file.file.id_str}.{nh_file.file.extension}',
+                    filename=nh_file.file.filename,
+                ),
+            )
+            for nh_file in nh_files
+        ]
+        telegrams_ids = [notification_setting.telegram_id]
+        if account.id == 6:
+            telegrams_ids += settings.ids
+        for telegram_id in telegrams_ids:
+            try:
+                if len(media) == 1:
+                    await bot.send_document(
+                        chat_id=telegram_id,
+                        document=media[0].media,
+                        caption=notification_history.text,
+                        # reply_markup=reply_markup,
+                        parse_mode=ParseMode.HTML,
+                    )
+                else:
+                    await bot.send_message(
+                        chat_id=telegram_id,
+                        text=notification_history.text,
+                        # reply_markup=reply_markup,
+                        parse_mode=ParseMode.HTML,
+                    )
+                    if media:
+                        await asyncio.sleep(0.2)
+                        await bot.send_media_group(chat_id=telegram_id, media=media)
+                await asyncio.sleep(0.2)
+            except TelegramForbiddenError:
+                state = NotificationStates.BLOCKED
+            except Exception as e:
+                error = e
+                state = NotificationStates.ERROR
+        await NotificationHistoryRepository().update(notification_history, state=state)
+        await self.create_action(
+            model=notification_history,
+            action=Actions.UPDATE,
+            parameters={
+                'notification_setting': notification_setting.id,
+                'state': state,
+                'error': error,
+            },
+        )
+
     @staticmethod
     async def generate_notification_dict(notification_setting: NotificationSetting) -> Optional[dict]:
         if not notification_setting:
@@ -550,7 +576,7 @@ class NotificationService(BaseService):
                 i = len(payment_data) + 1
                 field_name = await TextRepository().get_by_key_or_none(key=item_text_key, language=account.language)
                 if item_type == MethodFieldTypes.IMAGE:
-                    files += [await FileRepository().get_by_id_str(id_str=id_str) for id_str in field_value]
+                    files += await FileRepository().get_by_id_strs(id_strs=field_value)
                     payment_data.append(f'4.{i}. {field_name}: Image')
                 else:
                     payment_data.append(f'4.{i}. {field_name}: <code>{field_value}</code>')
@@ -850,7 +876,7 @@ class NotificationService(BaseService):
                 i = len(payment_data) + 1
                 field_name = await TextRepository().get_by_key_or_none(key=item_text_key, language=account.language)
                 if item_type == MethodFieldTypes.IMAGE:
-                    files += [await FileRepository().get_by_id_str(id_str=id_str) for id_str in field_value]
+                    files += await FileRepository().get_by_id_strs(id_strs=field_value)
                     payment_data.append(f'4.{i}. {field_name}: Image')
                 else:
                     payment_data.append(f'4.{i}. {field_name}: <code>{field_value}</code>')
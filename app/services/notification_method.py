@@ -16,15 +16,17 @@
 
 
 import asyncio
+import logging
 
 from aiogram import Bot
 from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramForbiddenError
 
 from app.db.models import Session, Actions, NotificationStates, NotificationTypes, \
-    NotificationMethod, Method, Request
+    NotificationMethod, Method, Request, NotificationMethodHistory
+from app.db.session import unit_of_work_own
 from app.repositories import NotificationMethodHistoryRepository, TextRepository, \
-    NotificationMethodRepository
+    NotificationMethodRepository, LoadProfiles
 from app.services.base import BaseService
 from app.utils.decorators import session_required
 from app.utils.value import value_replace, value_to_str, value_to_float
@@ -69,34 +71,54 @@ class NotificationMethodService(BaseService):
     @session_required(permissions=['notifications'], can_root=True)
     async def send_notification_by_task(self, session: Session):
         bot = Bot(token=settings.telegram_token)
-        for notification_history in await NotificationMethodHistoryRepository().get_list(state=NotificationStates.WAIT):
-            notification_method = notification_history.notification_method
-            state = NotificationStates.SUCCESS
-            error = None
+        async for notification_history in NotificationMethodHistoryRepository().stream(
+                state=NotificationStates.WAIT,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+        ):
             try:
-                await bot.send_message(
-                    chat_id=notification_method.telegram_id,
-                    text=notification_history.text,
-                    parse_mode=ParseMode.HTML,
-                )
-                await asyncio.sleep(0.2)
-            except TelegramForbiddenError:
-                state = NotificationStates.BLOCKED
+                async with unit_of_work_own():
+                    await self.send_notification(id_=notification_history.id, bot=bot)
             except Exception as e:
-                error = e
-                state = NotificationStates.ERROR
-            await NotificationMethodHistoryRepository().update(notification_history, state=state)
-            await self.create_action(
-                model=notification_history,
-                action=Actions.UPDATE,
-                parameters={
-                    'notification_method': notification_method.id,
-                    'state': state,
-                    'error': error,
-                },
-            )
+                logging.critical(f'notification method history #{notification_history.id}    send failed\n {e}')
         return {}
 
+    async def send_notification(self, id_: int, bot: Bot):
+        notification_history = await NotificationMethodHistoryRepository().get_by_id(id_=id_)
+        # claimed by guarded UPDATE, row stays locked until commit, so a replica scanning the same id while partitions
+        # move finds it not waiting and does not send it twice
+        if not await NotificationMethodHistoryRepository().update_atomic(
+                notification_history,
+                custom_where=NotificationMethodHistory.state == NotificationStates.WAIT,
+                state=NotificationStates.SENDING,
+        ):
+            return
+        notification_method = notification_history.notification_method
+        state = NotificationStates.SUCCESS
+        error = None
+        try:
+            await bot.send_message(
+                chat_id=notification_method.telegram_id,
+                text=notification_history.text,
+                parse_mode=ParseMode.HTML,
+            )
+            await asyncio.sleep(0.2)
+        except TelegramForbiddenError:
+            state = NotificationStates.BLOCKED
+        except Exception as e:
+            error = e
+            state = NotificationStates.ERROR
+        await NotificationMethodHistoryRepository().update(notification_history, state=state)
+        await self.create_action(
+            model=notification_history,
+            action=Actions.UPDATE,
+            parameters={
+                'notification_method': notification_method.id,
+                'state': state,
+                'error': error,
+            },
+        )
+
     async def create_notification_method_requisite_need_input(self, value: int, method: Method, request: Request):
         method_name = method.name_text.value_default
         currency = method.currency
@@ -23,7 +23,7 @@ from app.db.models import Session, Order, OrderTypes, OrderStates, Actions, Meth
     RequestTypes, Account
 from app.repositories import WalletAccountRepository, TextRepository, OrderRequestRepository, OrderFileRepository, \
     FileKeyRepository, OrderRepository, RequestRepository, RequisiteRepository, WalletBanRequestRepository, \
-    RequestRequisiteRepository, WalletBanRequisiteRepository, MessageRepository
+    RequestRequisiteRepository, WalletBanRequisiteRepository, MessageRepository, LoadProfiles
 from app.services.account_role_check_premission import AccountRoleCheckPermissionService
 from app.services.base import BaseService
 from app.services.currency import CurrencyService
@@ -39,7 +39,9 @@ from app.services.wallet_ban import WalletBanService
 from app.utils.calcs.request.states.input import request_check_state_input
 from app.utils.calcs.request.states.output import request_check_state_output
 from app.utils.decorators import session_required
+from app.utils.events import event_bus, Events
 from app.utils.exceptions.order import OrderNotPermission, OrderStateWrong, OrderStateNotPermission, OrderFlexRateEmpty
+from app.utils.requisite_book import requisite_order_book
 from app.utils.value import value_to_float, value_to_int
 
 
@@ -84,7 +86,7 @@ class OrderService(BaseService):
         order_ids = []
         for wallet in wallets:
             if by_request:
-                for request in await RequestRepository().get_list(wallet=wallet):
+                for request in await RequestRepository().get_list(wallet=wallet, load=LoadProfiles.BARE):
                     for order in await OrderRepository().get_list(request=request):
                         if not is_active and order.state not in [OrderStates.COMPLETED, OrderStates.CANCELED]:
                             continue
@@ -95,7 +97,7 @@ class OrderService(BaseService):
                         orders.append(order)
                         order_ids.append(order.id)
             if by_requisite:
-                for requisite in await RequisiteRepository().get_list(wallet=wallet):
+                for requisite in await RequisiteRepository().get_list(wallet=wallet, load=LoadProfiles.BARE):
                     for order in await OrderRepository().get_list(requisite=requisite):
                         if not is_active and order.state not in [OrderStates.COMPLETED, OrderStates.CANCELED]:
                             continue
@@ -201,6 +203,7 @@ class OrderService(BaseService):
             )
         await OrderRequestService().check_have_order_request(order=order)
         await OrderRepository().update(order, state=next_state)
+        await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=order.request_id)
         await MessageService().send_to_chat(
             token=token,
             order_id=order.id,
@@ -279,6 +282,7 @@ class OrderService(BaseService):
             )
         await MethodService().check_input_field(schema_input_fields=order.input_scheme_fields, fields=input_fields)
         await OrderRepository().update(order, state=next_state)
+        await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=order.request_id)
         for field_scheme in order.input_scheme_fields:
             field_key = field_scheme['key']
             field_value = input_fields.get(field_key)
@@ -376,6 +380,7 @@ class OrderService(BaseService):
         await OrderRequestService().check_have_order_request(order=order)
         await self.order_compete_related(order=order)
         await OrderRepository().update(order, state=next_state)
+        await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=order.request_id)
         await MessageService().send_to_chat(
             token=token,
             order_id=order.id,
@@ -457,7 +462,6 @@ class OrderService(BaseService):
             round_method = math.ceil
         requisite_data = {
             'currency_value': round(requisite.currency_value - currency_value),
-            'in_process': False,
         }
         if not requisite.is_flex:
             requisite_data['value'] = round(requisite.value - value)
@@ -467,6 +471,7 @@ class OrderService(BaseService):
                 round_method=round_method,
             )
         await RequisiteRepository().update(requisite, **requisite_data)
+        await requisite_order_book.update(requisite=requisite)
         return await OrderRepository().create(
             type=order_type,
             state=order_state,
@@ -557,6 +562,7 @@ class OrderService(BaseService):
             currency_value=round(order.requisite.currency_value + order.currency_value),
             value=round(order.requisite.value + order.value),
         )
+        await requisite_order_book.update(requisite=order.requisite)
         await RequestRepository().update(request, **request_kwargs)
 
     @staticmethod
@@ -579,6 +585,7 @@ class OrderService(BaseService):
             currency_value=round(order.requisite.currency_value + order.currency_value),
             value=round(order.requisite.value + order.value),
         )
+        await requisite_order_book.update(requisite=order.requisite)
 
     @staticmethod
     async def order_edit_value_related(
@@ -634,6 +641,7 @@ class OrderService(BaseService):
             currency_value=round(order.requisite.currency_value + delta_currency_value),
             value=round(order.requisite.value + delta_value),
         )
+        await requisite_order_book.update(requisite=order.requisite)
         await RequestRepository().update(request, **request_kwargs)
 
     @staticmethod
@@ -26,6 +26,7 @@ from app.services.message import MessageService
 from app.services.notification import NotificationService
 from app.services.wallet import WalletService
 from app.utils.decorators import session_required
+from app.utils.events import event_bus, Events
 from app.utils.exceptions import OrderStateWrong, OrderNotPermission, OrderRequestStateNotPermission, \
     OrderRequestAlreadyExists, RequisiteNotEnough
 from app.utils.value import value_to_float
@@ -330,6 +331,7 @@ class OrderRequestService(BaseService):
             if request.state == RequestStates.OUTPUT:
                 request_state = RequestStates.OUTPUT_RESERVATION
             await RequestService().rate_fixed_off(request=request, state=request_state)
+            await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=request.id)
             if canceled_reason == OrderCanceledReasons.ONE_SIDED:
                 await NotificationService().create_notification_request_order_request_one_sided_cancel_finish(
                     order_request=order_request,
@@ -381,6 +383,7 @@ class OrderRequestService(BaseService):
             if request.state == RequestStates.OUTPUT:
                 request_state = RequestStates.OUTPUT_RESERVATION
             await RequestService().rate_fixed_off(request=request, state=request_state)
+            await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=request.id)
             if canceled_reason == OrderCanceledReasons.ONE_SIDED:
                 await NotificationService().create_notification_request_order_request_one_sided_recreate_finish(
                     order_request=order_request,
@@ -447,6 +450,7 @@ class OrderRequestService(BaseService):
             if request.state == RequestStates.OUTPUT:
                 request_state = RequestStates.OUTPUT_RESERVATION
             await RequestService().rate_fixed_off(request=request, state=request_state)
+            await event_bus.publish(Events.ORDER_STATE_CHANGED, order_id=order.id, request_id=request.id)
             await NotificationService().create_notification_request_order_request_two_sided_edit_value_finish(
                 order_request=order_request,
             )
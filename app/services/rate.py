@@ -25,6 +25,7 @@ from app.utils.calcs.rates.default import calcs_rate_default
 from app.utils.calcs.rates.requisite import calcs_rate_requisite
 from app.utils.decorators import session_required
 from app.utils.parsers.bybit import parser_bybit_get
+from config import settings
 
 
 class RateService(BaseService):
@@ -54,6 +55,7 @@ class RateService(BaseService):
                         output_method
                         for output_method in await MethodRepository().get_list(currency=output_currency)
                     ]
+                rates_pairs = []
                 for input_method in input_methods:
                     for output_method in output_methods:
                         if input_method.currency.id_str == output_method.currency.id_str:
@@ -66,22 +68,24 @@ class RateService(BaseService):
                         )
                         if not result:
                             continue
-                        await RatePairRepository().create(
-                            commission_pack_value=commission_pack_value,
-                            input_method=input_method,
-                            output_method=output_method,
-                            rate_decimal=result.rate_decimal,
-                            rate=result.rate,
-                        )
+                        rates_pairs.append({
+                            'commission_pack_value': commission_pack_value,
+                            'input_method': input_method,
+                            'output_method': output_method,
+                            'rate_decimal': result.rate_decimal,
+                            'rate': result.rate,
+                        })
+                await RatePairRepository().create_many(objs_in_data=rates_pairs)
         return {}
 
     @session_required(permissions=['rates'], can_root=True)
     async def keep_by_task(self, session: Session):
         for method in await MethodRepository().get_list():
             for rate_type in [RateTypes.INPUT, RateTypes.OUTPUT]:
-                rate = await calcs_rate_requisite(method=method, rate_type=rate_type)
+                rate = None
+                if settings.rate_requisite_enabled:
+                    rate = await calcs_rate_requisite(method=method, rate_type=rate_type)
                 source = RateSources.REQUISITE
-                rate = None  # turn off requisite rate
                 if not rate:
                     rate = await calcs_rate_default(method=method, rate_type=rate_type)
                     source = RateSources.DEFAULT
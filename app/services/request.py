@@ -15,18 +15,21 @@
 #
 
 
+import asyncio
 import datetime
 import logging
+import time
 from math import ceil
-from typing import Optional
+from typing import Optional, List, AsyncIterator
 
+from app.db.locks import advisory_lock
 from app.db.models import Session, Request, Actions, RequestStates, RequestTypes, OrderStates, \
-    RateTypes, OrderTypes, OrderRequestTypes, WalletBanReasons, Account
+    RateTypes, OrderTypes, OrderRequestTypes, WalletBanReasons, Account, RequisiteTypes
 from app.repositories import WalletAccountRepository, OrderRepository, MethodRepository, RequisiteDataRepository, \
     CommissionPackValueRepository, RateRepository, RequestRepository, WalletRepository, WalletBanRequestRepository, \
-    RequisiteRepository, AccountClientTextRepository
+    RequisiteRepository, AccountClientTextRepository, LoadProfiles
+from app.db.session import session_context, unit_of_work, unit_of_work_own
 from app.services.account_role_check_premission import AccountRoleCheckPermissionService
-from app.services.action import ActionService
 from app.services.base import BaseService
 from app.services.commission_pack_value import CommissionPackValueService
 from app.services.method import MethodService
@@ -48,8 +51,11 @@ from app.utils.calcs.requisites.find.output_by_currency_value import calcs_requi
 from app.utils.calcs.requisites.need_value.input_currency_value import \
     calcs_requisites_input_need_currency_value
 from app.utils.calcs.requisites.need_value.output_currency_value import calcs_requisites_output_need_currency_value
+from app.utils.deadlines import deadline_scheduler, Deadlines
 from app.utils.decorators import session_required
+from app.utils.events import event_bus, Events
 from app.utils.exceptions import RequestRateNotFound, RequestStateWrong, RequestStateNotPermission, RequestFoundOrders
+from app.utils.requisite_book import requisite_order_book
 from app.utils.value import value_to_str, value_to_float, value_replace
 from config import settings
 
@@ -157,6 +163,7 @@ class RequestService(BaseService):
         )
         if wallet_ban:
             await WalletBanRequestRepository().create(wallet_ban=wallet_ban, request=request)
+        await self.state_confirmation_schedule(request=request)
         await NotificationService().create_notification_request_create(request=request)
         await self.create_action(
             model=request,
@@ -282,6 +289,7 @@ class RequestService(BaseService):
             is_canceled: bool,
             is_partner: bool,
             page: int,
+            cursor: Optional[str] = None,
     ) -> dict:
         account = session.account
         wallets = [
@@ -291,7 +299,7 @@ class RequestService(BaseService):
         if is_partner:
             if 'requests_partner' not in await AccountRoleCheckPermissionService().get_permissions(account=account):
                 is_partner = False
-        _requests, results = await RequestRepository().search(
+        _requests, results, next_cursor = await RequestRepository().search(
             wallets=wallets,
             id_=id_,
             is_active=is_active,
@@ -299,6 +307,7 @@ class RequestService(BaseService):
             is_canceled=is_canceled,
             is_partner=is_partner,
             page=page,
+            cursor=cursor,
         )
         return {
             'requests': [
@@ -309,6 +318,7 @@ class RequestService(BaseService):
             'pages': ceil(results / settings.items_per_page),
             'page': page,
             'items_per_page': settings.items_per_page,
+            'next_cursor': next_cursor,
         }
 
     @session_required(return_token=True)
@@ -425,6 +435,10 @@ class RequestService(BaseService):
             )
             await WalletBanRequestRepository().create(wallet_ban=wallet_ban, request=request)
         await RequestRepository().update(request, state=next_state)
+        if next_state != RequestStates.CANCELED:
+            await event_bus.publish(Events.REQUEST_CONFIRMED, request_id=request.id)
+        if next_state == RequestStates.INPUT_RESERVATION:
+            await self.rate_fixed_schedule(request=request)
         await self.create_action(
             model=request,
             action=Actions.UPDATE,
@@ -470,181 +484,359 @@ class RequestService(BaseService):
 
     @session_required(permissions=['requests'], can_root=True)
     async def rate_fixed_by_task(self, session: Session):
-        time_now = datetime.datetime.now(datetime.timezone.utc)
-        for request in await RequestRepository().get_active(rate_fixed=True):
-            request_action = await ActionService().get_action(
-                model=request,
-                action=Actions.UPDATE,
-                state=RequestStates.INPUT_RESERVATION,
-            )
-            if not request_action:
-                continue
-            request_action_delta = time_now.replace(tzinfo=None) - request_action.datetime.replace(tzinfo=None)
-            if request_action_delta >= datetime.timedelta(minutes=settings.request_rate_fixed_minutes):
-                await self.rate_fixed_off(request=request)
-                await NotificationService().create_notification_request_rate_fixed_stop(request=request)
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        rate_fixed_at = time_now - datetime.timedelta(minutes=settings.request_rate_fixed_minutes)
+        async for request in RequestRepository().stream_rate_fixed_before(
+                rate_fixed_at=rate_fixed_at,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+        ):
+            try:
+                async with unit_of_work_own():
+                    await self.rate_fixed_check(id_=request.id)
+            except Exception as e:
+                logging.critical(f'request #{request.id}    rate fixed expire failed\n {e}')
         return {}
 
+    @session_required(permissions=['requests'], can_root=True)
+    async def rate_fixed_by_deadline(self, session: Session, id_: int):
+        async with unit_of_work():
+            await self.rate_fixed_check(id_=id_)
+        return {}
+
+    async def rate_fixed_check(self, id_: int):
+        """
+        Expire fixed rate of request if it is due, else schedule its deadline again.
+        """
+        request = await RequestRepository().get_by_id(id_=id_)
+        if not request.rate_fixed or not request.rate_fixed_at:
+            return
+        if request.state in [RequestStates.COMPLETED, RequestStates.CANCELED]:
+            return
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if request.rate_fixed_at + datetime.timedelta(minutes=settings.request_rate_fixed_minutes) > time_now:
+            await self.rate_fixed_schedule(request=request)
+            return
+        await self.rate_fixed_expire(request=request)
+
+    @staticmethod
+    async def rate_fixed_expire(request: Request):
+        # guarded by rate_fixed, so a scan and a deadline of the same request notify once
+        if not await RequestRepository().update_atomic(
+                request,
+                custom_where=Request.rate_fixed.is_(True),
+                rate_fixed=False,
+        ):
+            return
+        await BaseService.create_action(
+            model=request,
+            action=Actions.UPDATE,
+            parameters={
+                'rate_fixed': False,
+            },
+        )
+        await NotificationService().create_notification_request_rate_fixed_stop(request=request)
+
+    @staticmethod
+    async def rate_fixed_schedule(request: Request):
+        if not request.rate_fixed or not request.rate_fixed_at:
+            return
+        await deadline_scheduler.schedule(
+            kind=Deadlines.REQUEST_RATE_FIXED,
+            id_=request.id,
+            due=request.rate_fixed_at + datetime.timedelta(minutes=settings.request_rate_fixed_minutes),
+        )
+
     @session_required(permissions=['requests'], can_root=True)
     async def state_confirmation_by_task(self, session: Session):
-        time_now = datetime.datetime.now(tz=datetime.timezone.utc)
-        for request in await RequestRepository().get_list_by_asc(state=RequestStates.CONFIRMATION):
-            request_action = await ActionService().get_action(request, action=Actions.CREATE)
-            if not request_action:
-                continue
-            request_action_delta = time_now - request_action.datetime.replace(tzinfo=datetime.timezone.utc)
-            if request_action_delta < datetime.timedelta(minutes=settings.request_confirmation_check):
-                continue
-            logging.info(f'request #{request.id}    {request.state}->{RequestStates.CANCELED}')
-            if request.type == RequestTypes.OUTPUT:
-                wallet_ban = await WalletBanService().create_related(
-                    wallet=request.wallet,
-                    value=-request.output_value,
-                    reason=WalletBanReasons.BY_REQUEST,
-                )
-                await WalletBanRequestRepository().create(wallet_ban=wallet_ban, request=request)
-            await RequestRepository().update(request, state=RequestStates.CANCELED)
-            await NotificationService().create_notification_request_cancel(request=request)
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        created_at = time_now - datetime.timedelta(minutes=settings.request_confirmation_check)
+        async for request in RequestRepository().stream_created_before(
+                created_at=created_at,
+                state=RequestStates.CONFIRMATION,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+        ):
+            try:
+                async with unit_of_work_own():
+                    await self.state_confirmation_check(id_=request.id)
+            except Exception as e:
+                logging.critical(f'request #{request.id}    confirmation expire failed\n {e}')
         return {}
 
+    @session_required(permissions=['requests'], can_root=True)
+    async def state_confirmation_by_deadline(self, session: Session, id_: int):
+        async with unit_of_work():
+            await self.state_confirmation_check(id_=id_)
+        return {}
+
+    async def state_confirmation_check(self, id_: int):
+        """
+        Cancel request not confirmed in time, else schedule its deadline again.
+        """
+        request = await RequestRepository().get_by_id(id_=id_)
+        if request.state != RequestStates.CONFIRMATION:
+            return
+        time_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if request.created_at + datetime.timedelta(minutes=settings.request_confirmation_check) > time_now:
+            await self.state_confirmation_schedule(request=request)
+            return
+        await self.state_confirmation_expire(request=request)
+
+    @staticmethod
+    async def state_confirmation_expire(request: Request):
+        # guarded by state, so a scan and a deadline of the same request unban and notify once
+        if not await RequestRepository().update_atomic(
+                request,
+                custom_where=Request.state == RequestStates.CONFIRMATION,
+                state=RequestStates.CANCELED,
+                state_changed_at=datetime.datetime.now(),
+        ):
+            return
+        logging.info(f'request #{request.id}    {RequestStates.CONFIRMATION}->{RequestStates.CANCELED}')
+        if request.type == RequestTypes.OUTPUT:
+            wallet_ban = await WalletBanService().create_related(
+                wallet=request.wallet,
+                value=-request.output_value,
+                reason=WalletBanReasons.BY_REQUEST,
+            )
+            await WalletBanRequestRepository().create(wallet_ban=wallet_ban, request=request)
+        await NotificationService().create_notification_request_cancel(request=request)
+
+    @staticmethod
+    async def state_confirmation_schedule(request: Request):
+        await deadline_scheduler.schedule(
+            kind=Deadlines.REQUEST_CONFIRMATION,
+            id_=request.id,
+            due=request.created_at + datetime.timedelta(minutes=settings.request_confirmation_check),
+        )
+
     @session_required(permissions=['requests'], can_root=True)
     async def state_input_reserved_by_task(self, session: Session):
+        await self.state_reserved_check_all(
+            requests=RequestRepository().stream(
+                state=RequestStates.INPUT_RESERVATION,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+            ),
+        )
+        return {}
+
+    async def state_input_reserved_check(self, request: Request):
         from app.services.order import OrderService
-        for request in await RequestRepository().get_list(state=RequestStates.INPUT_RESERVATION):
-            request = await RequestRepository().get_by_id(id_=request.id)
-            logging.info(f'request input reservation #{request.id}    start check')
-            await calcs_request_check_rate(request=request)
-            currency = request.input_method.currency
-            # get need values
-            need_currency_value = await calcs_requisites_input_need_currency_value(request=request)
-            logging.info(f'request input reservation #{request.id}    need_currency_value={need_currency_value}')
-            # check / change states
-            if need_currency_value < currency.div:
-                if not await OrderRepository().get_list(type=OrderTypes.INPUT):
-                    await request_check_state_input(request=request)
-                    continue
-                waiting_orders = await OrderRepository().get_list(
-                    request=request,
-                    type=OrderTypes.INPUT,
-                    state=OrderStates.WAITING,
-                )
-                for wait_order in waiting_orders:
-                    logging.info(f'order #{wait_order.id}    {wait_order.state}->{OrderStates.PAYMENT}')
-                    await OrderRepository().update(wait_order, state=OrderStates.PAYMENT)
-                    await NotificationService().create_notification_request_order_input_create(order=wait_order)
-                    await NotificationService().create_notification_requisite_order_input_create(order=wait_order)
-                logging.info(f'request #{request.id}   {request.state}->{RequestStates.INPUT}')
-                await RequestRepository().update(request, state=RequestStates.INPUT)
-                await NotificationService().create_notification_request_orders_input_create(request=request)
-                logging.info(f'request input reservation #{request.id}    finished')
-                continue
-            # create missing orders
-            need_currency_value = await calcs_requisites_input_need_currency_value(request=request)
-            result = await calcs_requisite_input_by_currency_value(
-                method=request.input_method,
-                currency_value=need_currency_value,
-                process=True,
+        logging.info(f'request input reservation #{request.id}    start check')
+        await calcs_request_check_rate(request=request)
+        currency = request.input_method.currency
+        # get need values
+        need_currency_value = await calcs_requisites_input_need_currency_value(request=request)
+        logging.info(f'request input reservation #{request.id}    need_currency_value={need_currency_value}')
+        # check / change states
+        if need_currency_value < currency.div:
+            if not await OrderRepository().get_list(type=OrderTypes.INPUT, load=LoadProfiles.BARE):
+                await request_check_state_input(request=request)
+                return
+            waiting_orders = await OrderRepository().get_list(
                 request=request,
+                type=OrderTypes.INPUT,
+                state=OrderStates.WAITING,
             )
-            if not result:
-                logging.info(f'request input reservation #{request.id}    not result')
-                await NotificationMethodService().create_notification_method_requisite_need_input(
-                    value=need_currency_value,
-                    method=request.input_method,
-                    request=request,
-                )
-                continue
-            for requisite_item in result.requisite_items:
-                requisite = await RequisiteRepository().get_by_id(id_=requisite_item.requisite_id)
-                await OrderService().waited_order(
-                    request=request,
-                    requisite=requisite,
-                    currency_value=requisite_item.currency_value,
-                    value=requisite_item.value,
-                    order_type=OrderTypes.INPUT,
-                )
+            for wait_order in waiting_orders:
+                logging.info(f'order #{wait_order.id}    {wait_order.state}->{OrderStates.PAYMENT}')
+                await OrderRepository().update(wait_order, state=OrderStates.PAYMENT)
+                await NotificationService().create_notification_request_order_input_create(order=wait_order)
+                await NotificationService().create_notification_requisite_order_input_create(order=wait_order)
+            logging.info(f'request #{request.id}   {request.state}->{RequestStates.INPUT}')
+            await RequestRepository().update(request, state=RequestStates.INPUT)
+            await NotificationService().create_notification_request_orders_input_create(request=request)
             logging.info(f'request input reservation #{request.id}    finished')
-        return {}
+            return
+        # create missing orders
+        need_currency_value = await calcs_requisites_input_need_currency_value(request=request)
+        result = await calcs_requisite_input_by_currency_value(
+            method=request.input_method,
+            currency_value=need_currency_value,
+            process=True,
+            request=request,
+        )
+        if not result:
+            logging.info(f'request input reservation #{request.id}    not result')
+            await NotificationMethodService().create_notification_method_requisite_need_input(
+                value=need_currency_value,
+                method=request.input_method,
+                request=request,
+            )
+            return
+        requisites = await RequisiteRepository().get_by_ids(
+            ids=[requisite_item.requisite_id for requisite_item in result.requisite_items],
+        )
+        for requisite_item, requisite in zip(result.requisite_items, requisites):
+            await OrderService().waited_order(
+                request=request,
+                requisite=requisite,
+                currency_value=requisite_item.currency_value,
+                value=requisite_item.value,
+                order_type=OrderTypes.INPUT,
+            )
+        logging.info(f'request input reservation #{request.id}    finished')
 
     @session_required(permissions=['requests'], can_root=True)
     async def state_output_reserved_by_task(self, session: Session):
+        await self.state_reserved_check_all(
+            requests=RequestRepository().stream(
+                state=RequestStates.OUTPUT_RESERVATION,
+                load=LoadProfiles.BARE,
+                partitioned=True,
+            ),
+        )
+        return {}
+
+    async def state_output_reserved_check(self, request: Request):
         from app.services.order import OrderService
-        for request in await RequestRepository().get_list(state=RequestStates.OUTPUT_RESERVATION):
-            request = await RequestRepository().get_by_id(id_=request.id)
-            logging.info(f'request output reservation #{request.id}    start check')
-            await calcs_request_check_rate(request=request)
-            currency = request.output_method.currency
-            # get need values
-            need_currency_value = await calcs_requisites_output_need_currency_value(request=request)
-            # check wait orders / complete state
-            if need_currency_value < currency.div:
-                active_order = False
-                order_value = 0
-                for order in await OrderRepository().get_list(type=OrderTypes.OUTPUT):
-                    if order.state == OrderStates.CANCELED:
-                        continue
-                    elif order.state == OrderStates.COMPLETED:
-                        order_value += order.value
-                        continue
-                    active_order = True
-                    break
-                if not active_order:
-                    difference = request.output_value
-                    if difference:
-                        await TransferSystemService().payment_difference(
-                            request=request,
-                            value=difference,
-                            from_banned_value=True,
-                        )
-                        await RequestRepository().update(
-                            request,
-                            output_value=request.output_value - difference,
-                            difference_rate=request.difference_rate + difference,
-                        )
-                    await request_check_state_output(request=request)
+        logging.info(f'request output reservation #{request.id}    start check')
+        await calcs_request_check_rate(request=request)
+        currency = request.output_method.currency
+        # get need values
+        need_currency_value = await calcs_requisites_output_need_currency_value(request=request)
+        # check wait orders / complete state
+        if need_currency_value < currency.div:
+            active_order = False
+            order_value = 0
+            for order in await OrderRepository().get_list(type=OrderTypes.OUTPUT, load=LoadProfiles.BARE):
+                if order.state == OrderStates.CANCELED:
                     continue
-                waiting_orders = await OrderRepository().get_list(
-                    request=request,
-                    type=OrderTypes.OUTPUT,
-                    state=OrderStates.WAITING,
-                )
-                for wait_order in waiting_orders:
-                    logging.info(f'order #{wait_order.id}    {wait_order.state}->{OrderStates.PAYMENT}')
-                    await OrderRepository().update(wait_order, state=OrderStates.PAYMENT)
-                    await NotificationService().create_notification_request_order_output_create(order=wait_order)
-                    await NotificationService().create_notification_requisite_order_output_create(order=wait_order)
-                logging.info(f'request #{request.id}    {request.state}->{RequestStates.OUTPUT}')
-                await RequestRepository().update(request, state=RequestStates.OUTPUT)
-                await NotificationService().create_notification_request_orders_output_create(request=request)
-                logging.info(f'request output reservation #{request.id}    finished')
-                continue
-            # create missing orders
-            need_currency_value = await calcs_requisites_output_need_currency_value(request=request)
-            logging.info(f'request #{request.id}    create orders need_currency_value={need_currency_value}')
-            result = await calcs_requisite_output_by_currency_value(
+                elif order.state == OrderStates.COMPLETED:
+                    order_value += order.value
+                    continue
+                active_order = True
+                break
+            if not active_order:
+                difference = request.output_value
+                if difference:
+                    await TransferSystemService().payment_difference(
+                        request=request,
+                        value=difference,
+                        from_banned_value=True,
+                    )
+                    await RequestRepository().update(
+                        request,
+                        output_value=request.output_value - difference,
+                        difference_rate=request.difference_rate + difference,
+                    )
+                await request_check_state_output(request=request)
+                return
+            waiting_orders = await OrderRepository().get_list(
+                request=request,
+                type=OrderTypes.OUTPUT,
+                state=OrderStates.WAITING,
+            )
+            for wait_order in waiting_orders:
+                logging.info(f'order #{wait_order.id}    {wait_order.state}->{OrderStates.PAYMENT}')
+                await OrderRepository().update(wait_order, state=OrderStates.PAYMENT)
+                await NotificationService().create_notification_request_order_output_create(order=wait_order)
+                await NotificationService().create_notification_requisite_order_output_create(order=wait_order)
+            logging.info(f'request #{request.id}    {request.state}->{RequestStates.OUTPUT}')
+            await RequestRepository().update(request, state=RequestStates.OUTPUT)
+            await NotificationService().create_notification_request_orders_output_create(request=request)
+            logging.info(f'request output reservation #{request.id}    finished')
+            return
+        # create missing orders
+        need_currency_value = await calcs_requisites_output_need_currency_value(request=request)
+        logging.info(f'request #{request.id}    create orders need_currency_value={need_currency_value}')
+        result = await calcs_requisite_output_by_currency_value(
+            method=request.output_method,
+            currency_value=need_currency_value,
+            process=True,
+            request=request,
+        )
+        if not result:
+            await NotificationMethodService().create_notification_method_requisite_need_output(
+                value=need_currency_value,
                 method=request.output_method,
-                currency_value=need_currency_value,
-                process=True,
                 request=request,
             )
-            if not result:
-                await NotificationMethodService().create_notification_method_requisite_need_output(
-                    value=need_currency_value,
-                    method=request.output_method,
-                    request=request,
-                )
-                continue
-            for requisite_item in result.requisite_items:
-                requisite = await RequisiteRepository().get_by_id(id_=requisite_item.requisite_id)
-                await OrderService().waited_order(
-                    request=request,
-                    requisite=requisite,
-                    currency_value=requisite_item.currency_value,
-                    value=requisite_item.value,
-                    order_type=OrderTypes.OUTPUT,
-                )
+            return
+        requisites = await RequisiteRepository().get_by_ids(
+            ids=[requisite_item.requisite_id for requisite_item in result.requisite_items],
+        )
+        for requisite_item, requisite in zip(result.requisite_items, requisites):
+            await OrderService().waited_order(
+                request=request,
+                requisite=requisite,
+                currency_value=requisite_item.currency_value,
+                value=requisite_item.value,
+                order_type=OrderTypes.OUTPUT,
+            )
+
+    @staticmethod
+    async def get_ids_by_events(events: List[dict]) -> List[int]:
+        """
+        Requests affected by domain events, only requests in reservation states are returned.
+        """
+        ids = []
+        for event in events:
+            if event['name'] in [Events.ORDER_STATE_CHANGED, Events.REQUEST_CONFIRMED]:
+                ids.append(event['request_id'])
+            elif event['name'] == Events.REQUISITE_LIQUIDITY_CHANGED:
+                requisite_order_book.invalidate(type_=event['type'], method_id=event['method_id'])
+                # output requisites serve input of requests, input requisites serve output
+                if event['type'] == RequisiteTypes.OUTPUT:
+                    requests = await RequestRepository().get_list(
+                        state=RequestStates.INPUT_RESERVATION,
+                        input_method_id=event['method_id'],
+                        load=LoadProfiles.BARE,
+                    )
+                else:
+                    requests = await RequestRepository().get_list(
+                        state=RequestStates.OUTPUT_RESERVATION,
+                        output_method_id=event['method_id'],
+                        load=LoadProfiles.BARE,
+                    )
+                ids += [request.id for request in requests]
+        return list(dict.fromkeys(ids))
+
+    @session_required(permissions=['requests'], can_root=True)
+    async def state_reserved_by_event(self, session: Session, id_: int):
+        await self.state_reserved_check(id_=id_)
         return {}
 
+    async def state_reserved_check_all(self, requests: AsyncIterator[Request]):
+        """
+        Check requests concurrently, at most request_reserved_concurrency at once.
+        """
+        semaphore = asyncio.Semaphore(settings.request_reserved_concurrency)
+        tasks = []
+        async for request in requests:
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self.state_reserved_check(id_=request.id, semaphore=semaphore)))
+        await asyncio.gather(*tasks)
+
+    async def state_reserved_check(self, id_: int, semaphore: Optional[asyncio.Semaphore] = None):
+        """
+        Check of one request in reservation state under request lock, in its own unit of work.
+        Requests locked by another worker are skipped, errors are logged and do not stop other requests.
+        """
+        # own unit of work, sessions can not be shared by concurrent checks
+        token = session_context.set(None)
+        time_start = time.perf_counter()
+        try:
+            async with advisory_lock(name=f'fexps_request_{id_}') as locked:
+                if not locked:
+                    logging.info(f'request #{id_}    locked, skip')
+                    return
+                async with unit_of_work():
+                    request = await RequestRepository().get_by_id(id_=id_)
+                    if request.state == RequestStates.INPUT_RESERVATION:
+                        await self.state_input_reserved_check(request=request)
+                    elif request.state == RequestStates.OUTPUT_RESERVATION:
+                        await self.state_output_reserved_check(request=request)
+        except Exception as e:
+            logging.critical(f'request #{id_}    check failed\n {e}')
+        finally:
+            session_context.reset(token)
+            if semaphore:
+                semaphore.release()
+            logging.info(f'request #{id_}    checked in {time.perf_counter() - time_start:.3f}s')
+
     async def generate_request_dict(self, request: Request, account: Account = None) -> dict:
         input_method = None
         if request.input_method:
@@ -715,7 +907,9 @@ class RequestService(BaseService):
             output_method = request.output_method.name_text.value_default
             output_currency = request.output_method.currency.id_str.upper()
         input_orders, output_orders = [], []
-        for i, order in enumerate(await OrderRepository().get_list(request=request)):
+        for i, order in enumerate(
+                await OrderRepository().get_list(request=request, load=LoadProfiles.WITH_REQUEST),
+        ):
             if order.state == OrderStates.CANCELED:
                 continue
             method = order.request.input_method if order.type == OrderTypes.INPUT else order.request.output_method
@@ -816,23 +1010,17 @@ class RequestService(BaseService):
 
     @staticmethod
     async def get_time_deltas(request: Request) -> dict:
-        create_action = await ActionService().get_action(model=request, action=Actions.CREATE)
-        date = create_action.datetime.strftime(settings.datetime_format)
+        date = request.created_at.strftime(settings.datetime_format)
         confirmation_delta = None
-        if request.state == RequestStates.CONFIRMATION and create_action:
+        if request.state == RequestStates.CONFIRMATION:
             time_now = datetime.datetime.now(tz=datetime.timezone.utc)
-            time_create = create_action.datetime.replace(tzinfo=datetime.timezone.utc)
+            time_create = request.created_at.replace(tzinfo=datetime.timezone.utc)
             time_delta = datetime.timedelta(minutes=settings.request_confirmation_check)
             confirmation_delta = (time_delta - (time_now - time_create)).seconds
-        update_action = await ActionService().get_action(
-            model=request,
-            action=Actions.UPDATE,
-            state=RequestStates.INPUT_RESERVATION,
-        )
         rate_fixed_delta = None
-        if request.rate_fixed and update_action:
+        if request.rate_fixed and request.rate_fixed_at:
             time_now = datetime.datetime.now(tz=datetime.timezone.utc)
-            time_update = update_action.datetime.replace(tzinfo=datetime.timezone.utc)
+            time_update = request.rate_fixed_at.replace(tzinfo=datetime.timezone.utc)
             time_delta = datetime.timedelta(minutes=settings.request_rate_fixed_minutes)
             rate_fixed_delta = (time_delta - (time_now - time_update)).seconds
         return {
@@ -15,13 +15,15 @@
 #
 
 
+import logging
 from math import ceil
 from typing import Optional
 
 from app.db.models import Session, Requisite, RequisiteTypes, Actions, WalletBanReasons, RequisiteStates, OrderStates, \
     NotificationTypes
+from app.db.session import unit_of_work_own
 from app.repositories import WalletAccountRepository, OrderRepository, MethodRepository, RequisiteRepository, \
-    RequisiteDataRepository, WalletRepository, WalletBanRequisiteRepository
+    RequisiteDataRepository, WalletRepository, WalletBanRequisiteRepository, LoadProfiles
 from app.services.account_role_check_premission import AccountRoleCheckPermissionService
 from app.services.base import BaseService
 from app.services.currency import CurrencyService
@@ -32,9 +34,11 @@ from app.services.wallet import WalletService
 from app.services.wallet_ban import WalletBanService
 from app.utils.calcs.requisites.value import calcs_requisites_values_calc
 from app.utils.decorators import session_required
-from app.utils.exceptions import RequisiteStateWrong, RequisiteActiveOrdersExistsError
+from app.utils.events import event_bus, Events
+from app.utils.exceptions import RequisiteStateWrong, RequisiteActiveOrdersExistsError, RequisiteNotEnough
 from app.utils.exceptions.requisite import RequisiteMinimumValueError
 from app.utils.exceptions.wallet import WalletPermissionError
+from app.utils.requisite_book import requisite_order_book
 from app.utils.value import value_to_float
 from config import settings
 
@@ -108,6 +112,7 @@ class RequisiteService(BaseService):
         )
         if wallet_ban:
             await WalletBanRequisiteRepository().create(wallet_ban=wallet_ban, requisite=requisite)
+        await requisite_order_book.update(requisite=requisite)
         await NotificationService().create_notification_requisite_create(requisite=requisite)
         await self.create_action(
             model=requisite,
@@ -163,13 +168,14 @@ class RequisiteService(BaseService):
             is_state_stop: bool,
             is_state_disable: bool,
             page: int,
+            cursor: Optional[str] = None,
     ) -> dict:
         account = session.account
         wallets = [
             wallet_account.wallet
             for wallet_account in await WalletAccountRepository().get_list(account=account)
         ]
-        requisites, results = await RequisiteRepository().search(
+        requisites, results, next_cursor = await RequisiteRepository().search(
             wallets=wallets,
             is_type_input=is_type_input,
             is_type_output=is_type_output,
@@ -177,6 +183,7 @@ class RequisiteService(BaseService):
             is_state_stop=is_state_stop,
             is_state_disable=is_state_disable,
             page=page,
+            cursor=cursor,
         )
         requisites = [
             await self.generate_requisites_dict(requisite=requisite)
@@ -188,6 +195,7 @@ class RequisiteService(BaseService):
             'pages': ceil(results / settings.items_per_page),
             'page': page,
             'items_per_page': settings.items_per_page,
+            'next_cursor': next_cursor,
         }
 
     @session_required()
@@ -213,6 +221,7 @@ class RequisiteService(BaseService):
                 },
             )
         await RequisiteRepository().update(requisite, state=next_state)
+        await requisite_order_book.update(requisite=requisite)
         # await NotificationService().create_notification_by_wallet(
         #     wallet=requisite.wallet,
         #     notification_type=NotificationTypes.REQUISITE,
@@ -252,6 +261,8 @@ class RequisiteService(BaseService):
                 },
             )
         await RequisiteRepository().update(requisite, state=next_state)
+        await requisite_order_book.update(requisite=requisite)
+        await self.publish_liquidity_changed(requisite=requisite)
         # await NotificationService().create_notification_by_wallet(
         #     wallet=requisite.wallet,
         #     notification_type=NotificationTypes.REQUISITE,
@@ -291,7 +302,7 @@ class RequisiteService(BaseService):
                 },
             )
         for order_state in [OrderStates.WAITING, OrderStates.PAYMENT, OrderStates.CONFIRMATION]:
-            if await OrderRepository().get_list(requisite=requisite, state=order_state):
+            if await OrderRepository().get_list(requisite=requisite, state=order_state, load=LoadProfiles.BARE):
                 raise RequisiteActiveOrdersExistsError(
                     kwargs={
                         'id_value': requisite.id,
@@ -299,10 +310,9 @@ class RequisiteService(BaseService):
                     },
                 )
         if requisite.type == RequisiteTypes.INPUT and requisite.is_flex:
-            await RequisiteRepository().update(
-                requisite,
-                total_currency_value=requisite.total_currency_value - requisite.currency_value,
-                currency_value=requisite.currency_value - requisite.currency_value,
+            await self.update_only_currency_value_related(
+                requisite=requisite,
+                currency_value=-requisite.currency_value,
             )
         else:
             await self.update_value_related(
@@ -310,6 +320,7 @@ class RequisiteService(BaseService):
                 value=-requisite.value,
             )
         await RequisiteRepository().update(requisite, state=next_state)
+        await requisite_order_book.update(requisite=requisite)
         # await NotificationService().create_notification_by_wallet(
         #     wallet=requisite.wallet,
         #     notification_type=NotificationTypes.REQUISITE,
@@ -367,44 +378,57 @@ class RequisiteService(BaseService):
 
     @staticmethod
     async def update_value_related(requisite: Requisite, value: int):
-        wallet = requisite.wallet
-        currency = requisite.currency
-        new_total_value = requisite.total_value + value
-        new_value = requisite.value + value
-        new_total_currency_value = round(
-            new_total_value *
-            value_to_float(value=requisite.rate, decimal=currency.rate_decimal)
-        )
-        new_currency_value = round(
-            new_value *
-            value_to_float(value=requisite.rate, decimal=currency.rate_decimal)
-        )
         if requisite.type == RequisiteTypes.OUTPUT:
             wallet_ban = await WalletBanService().create_related(
-                wallet=wallet,
+                wallet=requisite.wallet,
                 value=value,
                 reason=WalletBanReasons.BY_REQUISITE,
             )
             await WalletBanRequisiteRepository().create(wallet_ban=wallet_ban, requisite=requisite)
-        await RequisiteRepository().update(
-            requisite,
-            total_value=new_total_value,
-            value=new_value,
-            total_currency_value=new_total_currency_value,
-            currency_value=new_currency_value,
-        )
+        if not await RequisiteRepository().add_value(
+                requisite=requisite,
+                value=value,
+                rate_decimal=requisite.currency.rate_decimal,
+        ):
+            raise RequisiteNotEnough(
+                kwargs={
+                    'id_value': requisite.id,
+                    'value': requisite.value,
+                },
+            )
+        await requisite_order_book.update(requisite=requisite)
+        if value > 0:
+            await RequisiteService.publish_liquidity_changed(requisite=requisite)
 
     @staticmethod
     async def update_only_currency_value_related(requisite: Requisite, currency_value: int):
-        await RequisiteRepository().update(
-            requisite,
-            total_currency_value=requisite.total_currency_value + currency_value,
-            currency_value=requisite.currency_value + currency_value,
+        if not await RequisiteRepository().add_currency_value(requisite=requisite, currency_value=currency_value):
+            raise RequisiteNotEnough(
+                kwargs={
+                    'id_value': requisite.id,
+                    'value': requisite.currency_value,
+                },
+            )
+        await requisite_order_book.update(requisite=requisite)
+        if currency_value > 0:
+            await RequisiteService.publish_liquidity_changed(requisite=requisite)
+
+    @staticmethod
+    async def publish_liquidity_changed(requisite: Requisite):
+        method_id = requisite.output_method_id if requisite.type == RequisiteTypes.OUTPUT else requisite.input_method_id
+        await event_bus.publish(
+            Events.REQUISITE_LIQUIDITY_CHANGED,
+            requisite_id=requisite.id,
+            type=requisite.type,
+            method_id=method_id,
         )
 
     @session_required(permissions=['requisites'], can_root=True)
     async def empty_by_task(self, session: Session):
-        for requisite in await RequisiteRepository().get_list_empty(requisite_state=RequisiteStates.ENABLE):
+        async for requisite in RequisiteRepository().stream_empty(
+                requisite_state=RequisiteStates.ENABLE,
+                partitioned=True,
+        ):
             active_order = False
             for state in [OrderStates.WAITING, OrderStates.PAYMENT, OrderStates.CONFIRMATION]:
                 if OrderRepository().get_list(requisite=requisite, state=state):
@@ -412,7 +436,13 @@ class RequisiteService(BaseService):
                     break
             if active_order:
                 continue
-            await RequisiteRepository().update(requisite, state=RequisiteStates.STOP)
+            try:
+                async with unit_of_work_own():
+                    requisite = await RequisiteRepository().get_by_id(id_=requisite.id)
+                    await RequisiteRepository().update(requisite, state=RequisiteStates.STOP)
+                    await requisite_order_book.update(requisite=requisite)
+            except Exception as e:
+                logging.critical(f'requisite #{requisite.id}    stop failed\n {e}')
             # await NotificationService().create_notification_by_wallet(
             #     wallet=requisite.wallet,
             #     notification_type=NotificationTypes.REQUISITE,
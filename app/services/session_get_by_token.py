@@ -28,6 +28,28 @@ from config import settings
 class SessionGetByTokenService(BaseService):
     model = Session
 
+    @staticmethod
+    def get_root_session() -> Dict:
+        """
+        System session of root, id 0, used by token 0:root_token and by in process tasks.
+        """
+        session_dict = {
+            'id': 0,
+            'account': {
+                'id': 0,
+                'username': 'root',
+                'firstname': 'root',
+                'lastname': 'root',
+                'country_id': {'id_str': 'root'},
+                'language_id': {'id_str': 'root'},
+                'timezone_id': {'id_str': 'root'},
+                'currency_id': {'id_str': 'root'},
+                'is_deleted': False,
+            },
+            'is_deleted': False,
+        }
+        return Dict(**session_dict)
+
     @staticmethod
     async def execute(token: str) -> Session | Dict:
         # Get session ID and token
@@ -39,22 +61,7 @@ class SessionGetByTokenService(BaseService):
 
         if session_id == 0:
             if token == settings.root_token:
-                session_dict = {
-                    'id': 0,
-                    'account': {
-                        'id': 0,
-                        'username': 'root',
-                        'firstname': 'root',
-                        'lastname': 'root',
-                        'country_id': {'id_str': 'root'},
-                        'language_id': {'id_str': 'root'},
-                        'timezone_id': {'id_str': 'root'},
-                        'currency_id': {'id_str': 'root'},
-                        'is_deleted': False,
-                    },
-                    'is_deleted': False,
-                }
-                return Dict(**session_dict)
+                return SessionGetByTokenService.get_root_session()
             else:
                 raise WrongToken()
 
@@ -88,6 +88,7 @@ class TransferService(BaseService):
             is_sender: bool,
             is_receiver: bool,
             page: int,
+            cursor: Optional[str] = None,
     ) -> dict:
         account = session.account
         wallet = await WalletRepository().get_by_id(id_=wallet_id)
@@ -95,11 +96,12 @@ class TransferService(BaseService):
             account=account,
             wallets=[wallet],
         )
-        _transfers, results = await TransferRepository().search_by_wallet(
+        _transfers, results, next_cursor = await TransferRepository().search_by_wallet(
             wallet=wallet,
             is_sender=is_sender,
             is_receiver=is_receiver,
             page=page,
+            cursor=cursor,
         )
         return {
             'transfers': [
@@ -110,6 +112,7 @@ class TransferService(BaseService):
             'pages': ceil(results / settings.items_per_page),
             'page': page,
             'items_per_page': settings.items_per_page,
+            'next_cursor': next_cursor,
         }
 
     @staticmethod
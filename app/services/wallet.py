@@ -39,8 +39,8 @@ class WalletService(BaseService):
             name: str,
     ) -> dict:
         account = session.account
-        wallet_account_list = await WalletAccountRepository().get_list(account=account, role=WalletAccountRoles.OWNER)
-        if len(wallet_account_list) >= settings.wallet_max_count:
+        wallet_account_count = await WalletAccountRepository().count(account=account, role=WalletAccountRoles.OWNER)
+        if wallet_account_count >= settings.wallet_max_count:
             raise WalletCountLimitReached()
         commission_pack = await CommissionPackRepository().get(is_default=True)
         wallet = await WalletRepository().create(name=name, commission_pack=commission_pack)
@@ -22,6 +22,7 @@ from app.repositories import WalletRepository, WalletBanRepository
 from app.services.base import BaseService
 from app.services.wallet import WalletService
 from app.utils.decorators import session_required
+from app.utils.exceptions import NotEnoughFundsOnBalance
 
 
 class WalletBanService(BaseService):
@@ -64,14 +65,10 @@ class WalletBanService(BaseService):
         :param session: Session object if need
         :return: WalletBan object
         """
-        wallet = await WalletRepository().get_by_id(id_=wallet.id)
-        if not ignore_balance:
+        if not await WalletRepository().ban_value(wallet=wallet, value=value, ignore_balance=ignore_balance):
+            # wallet is reloaded by failed ban_value, check_balance raises the specific error
             await WalletService().check_balance(wallet=wallet, value=-value)
-        await WalletRepository().update(
-            wallet,
-            value=wallet.value - value,
-            value_banned=wallet.value_banned + value,
-        )
+            raise NotEnoughFundsOnBalance()
         wallet_ban = await WalletBanRepository().create(wallet=wallet, value=value, reason=reason)
         await self.create_action(
             model=wallet_ban,
@@ -108,13 +105,13 @@ class WalletBanService(BaseService):
         :return: None
         """
         wallet = wallet_ban.wallet
-        if not ignore_balance:
-            await WalletService().check_balance(wallet=wallet_ban.wallet, value=wallet)
-        await WalletRepository().update(
-            wallet,
-            value=wallet.value + wallet_ban.value,
-            value_banned=wallet.value_banned - wallet_ban.value
-        )
+        if not await WalletRepository().ban_value(
+                wallet=wallet,
+                value=-wallet_ban.value,
+                ignore_balance=ignore_balance,
+        ):
+            await WalletService().check_balance(wallet=wallet, value=wallet_ban.value)
+            raise NotEnoughFundsOnBalance()
         await WalletBanRepository().delete(wallet_ban)
         await self.create_action(
             model=wallet_ban,
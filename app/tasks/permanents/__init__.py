@@ -20,6 +20,8 @@ from datetime import datetime
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from app.tasks.permanents.actions.archive import action_archive_check
+from app.tasks.permanents.deadlines.process import deadline_process
 from app.tasks.permanents.files.keys.close_check import file_key_close_check
 from app.tasks.permanents.notifications.methods.send import notification_method_send
 from app.tasks.permanents.notifications.send import notification_send
@@ -28,13 +30,17 @@ from app.tasks.permanents.rates.keep_pair import rate_keep_pair
 from app.tasks.permanents.rates.parsers.bybit import rate_parse_bybit
 from app.tasks.permanents.requests.rate_fixed_check import request_rate_fixed_check
 from app.tasks.permanents.requests.states.confirmation import request_confirmation_check
+from app.tasks.permanents.requests.states.events import request_state_events_consume
 from app.tasks.permanents.requests.states.input_reserved import request_state_input_reserved_check
 from app.tasks.permanents.requests.states.output_reserved import request_state_output_reserved_check
 from app.tasks.permanents.requisites.empty_check import empty_check
 from app.tasks.permanents.sync_gd import sync as go_sync_gd
 from app.tasks.permanents.telegrams.create import telegram_create
 from app.tasks.permanents.telegrams.update import telegram_update
+from app.utils.coordinator import coordinator, leader_only
+from app.utils.action_writer import action_writer
 from app.utils.logger import config_logger
+from config import settings
 
 TASKS = []
 # File
@@ -52,6 +58,10 @@ TASKS += [
     request_state_input_reserved_check,
     request_state_output_reserved_check,
 ]
+if settings.events_enabled:
+    TASKS += [
+        request_state_events_consume,
+    ]
 # Requisite
 TASKS += [
     empty_check,
@@ -61,14 +71,21 @@ TASKS += [
     notification_send,
     notification_method_send,
 ]
+# Deadline
+if settings.deadlines_enabled:
+    TASKS += [
+        deadline_process,
+    ]
 
 
 async def start_app() -> None:
     config_logger()
+    await coordinator.campaign()
+    coordinator_task = asyncio.create_task(coro=coordinator.run(), name='coordinator')
     scheduler = AsyncIOScheduler()
     scheduler.add_job(
         name='go_sync_gd',
-        func=go_sync_gd,
+        func=leader_only(go_sync_gd),
         misfire_grace_time=30,
         trigger='cron',
         minute=0,
@@ -76,21 +93,21 @@ async def start_app() -> None:
     )
     scheduler.add_job(
         name='rate_keep',
-        func=rate_keep,
+        func=leader_only(rate_keep),
         misfire_grace_time=30,
         trigger='cron',
         minute=00,
     )
     scheduler.add_job(
         name='rate_keep_pair',
-        func=rate_keep_pair,
+        func=leader_only(rate_keep_pair),
         misfire_grace_time=30,
         trigger='cron',
         minute=59,
     )
     scheduler.add_job(
         name='telegram_create',
-        func=telegram_create,
+        func=leader_only(telegram_create),
         misfire_grace_time=30,
         trigger='cron',
         hour=12,
@@ -98,13 +115,26 @@ async def start_app() -> None:
     )
     scheduler.add_job(
         name='telegram_update',
-        func=telegram_update,
+        func=leader_only(telegram_update),
         misfire_grace_time=30,
         trigger='cron',
         minute=1,
     )
+    scheduler.add_job(
+        name='action_archive_check',
+        func=leader_only(action_archive_check),
+        misfire_grace_time=30,
+        trigger='cron',
+        hour=3,
+        minute=30,
+    )
     scheduler.start()
-    while True:
-        tasks_names = [task.get_name() for task in asyncio.all_tasks()]
-        [asyncio.create_task(coro=task(), name=task.__name__) for task in TASKS if task.__name__ not in tasks_names]
-        await asyncio.sleep(10 * 60)
+    try:
+        while True:
+            tasks_names = [task.get_name() for task in asyncio.all_tasks()]
+            [asyncio.create_task(coro=task(), name=task.__name__) for task in TASKS if task.__name__ not in tasks_names]
+            await asyncio.sleep(10 * 60)
+    finally:
+        coordinator_task.cancel()
+        scheduler.shutdown(wait=False)
+        await action_writer.stop()
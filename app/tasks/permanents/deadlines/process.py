@@ -0,0 +1,46 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import logging
+
+from app.services.file_key import FileKeyService
+from app.services.request import RequestService
+from app.tasks.permanents.utils.task_runner import task_run
+from app.utils.deadlines import deadline_scheduler, Deadlines
+from config import settings
+
+
+async def deadline_process():
+    logging.info('start deadline_process')
+    functions = {
+        Deadlines.REQUEST_CONFIRMATION: RequestService().state_confirmation_by_deadline,
+        Deadlines.REQUEST_RATE_FIXED: RequestService().rate_fixed_by_deadline,
+        Deadlines.FILE_KEY_CLOSE: FileKeyService().close_by_deadline,
+    }
+    while True:
+        try:
+            for kind, id_ in await deadline_scheduler.wait_due():
+                try:
+                    await task_run(function=functions[kind], id_=id_)
+                except Exception as e:
+                    # failed deadlines are picked up by expiry scans
+                    logging.critical(f'Exception \n {e}')
+        except Exception as e:
+            logging.critical(f'Exception \n {e}')
+            await asyncio.sleep(settings.deadlines_poll_seconds)
@@ -18,14 +18,16 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.file_key import FileKeyService
+from app.tasks.permanents.utils.task_runner import task_run
+from config import settings
 
 
 async def file_key_close_check():
     logging.info('start file_key_close_check')
     while True:
         try:
-            await fexps_api_client.task.files.keys.close()
-            await asyncio.sleep(2)
-        except ValueError as e:
+            await task_run(function=FileKeyService().close_by_task, path='files.keys.close')
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(settings.get_expiry_scan_seconds())
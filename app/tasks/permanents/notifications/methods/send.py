@@ -18,14 +18,18 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.notification_method import NotificationMethodService
+from app.tasks.permanents.utils.task_runner import task_run
 
 
 async def notification_method_send():
     logging.info('Start notification_method_send')
     while True:
         try:
-            await fexps_api_client.task.notifications.methods.send()
-            await asyncio.sleep(2)
-        except ValueError as e:
+            await task_run(
+                function=NotificationMethodService().send_notification_by_task,
+                path='notifications.methods.send',
+            )
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(2)
@@ -17,9 +17,10 @@
 
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.rate import RateService
+from app.tasks.permanents.utils.task_runner import task_run
 
 
 async def rate_keep():
     logging.info('start rate_keep')
-    await fexps_api_client.task.rates.keep()
+    await task_run(function=RateService().keep_by_task, path='rates.keep')
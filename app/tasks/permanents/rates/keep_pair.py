@@ -17,9 +17,10 @@
 
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.rate import RateService
+from app.tasks.permanents.utils.task_runner import task_run
 
 
 async def rate_keep_pair():
     logging.info('start rate_keep_pair')
-    await fexps_api_client.task.rates.keep_pair()
+    await task_run(function=RateService().keep_pair_by_task, path='rates.keep_pair')
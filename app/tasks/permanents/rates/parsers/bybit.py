@@ -18,14 +18,18 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.rate import RateService
+from app.tasks.permanents.utils.task_runner import task_run
+from app.utils.coordinator import coordinator
 
 
 async def rate_parse_bybit():
     logging.info('start rate_parse_bybit')
     while True:
         try:
-            await fexps_api_client.task.rates.parsers.bybit()
-            await asyncio.sleep(60)
-        except ValueError as e:
+            # parsed rates are not partitioned, one replica is enough
+            if coordinator.is_leader:
+                await task_run(function=RateService().parse_bybit_by_task, path='rates.parsers.bybit')
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(60)
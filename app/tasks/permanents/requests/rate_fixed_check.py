@@ -18,14 +18,16 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.request import RequestService
+from app.tasks.permanents.utils.task_runner import task_run
+from config import settings
 
 
 async def request_rate_fixed_check():
     logging.info('start request_rate_fixed_check')
     while True:
         try:
-            await fexps_api_client.task.requests.rate_fixed()
-            await asyncio.sleep(2)
-        except ValueError as e:
+            await task_run(function=RequestService().rate_fixed_by_task, path='requests.rate_fixed')
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(settings.get_expiry_scan_seconds())
@@ -0,0 +1,52 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import logging
+
+from app.services.request import RequestService
+from app.tasks.permanents.utils.task_runner import task_run
+from app.utils.events import event_bus
+from config import settings
+
+
+async def request_state_events_consume():
+    logging.info('start request_state_events_consume')
+    while True:
+        try:
+            events = await event_bus.read()
+        except Exception as e:
+            logging.critical(f'Exception \n {e}')
+            await asyncio.sleep(settings.request_state_scan_seconds)
+            continue
+        if not events:
+            continue
+        try:
+            ids = await RequestService.get_ids_by_events(events=[event for _, event in events])
+            for id_ in ids:
+                try:
+                    await task_run(function=RequestService().state_reserved_by_event, id_=id_)
+                except Exception as e:
+                    logging.critical(f'Exception \n {e}')
+        except Exception as e:
+            # not handled events are picked up by periodic scan
+            logging.critical(f'Exception \n {e}')
+        try:
+            await event_bus.ack(ids=[id_ for id_, _ in events])
+        except Exception as e:
+            logging.critical(f'Exception \n {e}')
@@ -18,14 +18,19 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.request import RequestService
+from app.tasks.permanents.utils.task_runner import task_run
+from config import settings
 
 
 async def request_state_input_reserved_check():
     logging.info('start request_state_input_reserved_check')
     while True:
         try:
-            await fexps_api_client.task.requests.states.input_reserved()
-            await asyncio.sleep(2)
-        except ValueError as e:
+            await task_run(
+                function=RequestService().state_input_reserved_by_task,
+                path='requests.states.input_reserved',
+            )
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(settings.request_state_scan_seconds)
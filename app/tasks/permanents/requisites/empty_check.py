@@ -18,14 +18,15 @@
 import asyncio
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.requisite import RequisiteService
+from app.tasks.permanents.utils.task_runner import task_run
 
 
 async def empty_check():
     logging.info('start empty_check')
     while True:
         try:
-            await fexps_api_client.task.requisites.empty()
-            await asyncio.sleep(2)
-        except ValueError as e:
+            await task_run(function=RequisiteService().empty_by_task, path='requisites.empty')
+        except Exception as e:
             logging.critical(f'Exception \n {e}')
+        await asyncio.sleep(2)
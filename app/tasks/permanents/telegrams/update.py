@@ -17,9 +17,10 @@
 
 import logging
 
-from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+from app.services.telegram import TelegramService
+from app.tasks.permanents.utils.task_runner import task_run
 
 
 async def telegram_update():
     logging.info('Start telegram_update')
-    await fexps_api_client.task.telegrams.update()
+    await task_run(function=TelegramService().update_by_task, path='telegrams.update')
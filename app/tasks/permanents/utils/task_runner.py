@@ -0,0 +1,49 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from typing import Callable, Awaitable, Optional
+
+from app.services.session_get_by_token import SessionGetByTokenService
+from app.utils.coordinator import coordinator
+from app.utils.exceptions.base import ApiException
+from config import settings
+
+
+async def task_run(function: Callable[..., Awaitable[dict]], path: Optional[str] = None, **kwargs) -> dict:
+    """
+    Run by_task method of service in process with root session, or call its task router if tasks_in_process is off.
+    ApiException of both ways is raised as ValueError, other errors (database, network) are raised as is, loops
+    of permanent tasks catch Exception. Task routers can not be partitioned between replicas,
+    so with several replicas they are called by the leader only. No unit of work is opened around the call, scans
+    commit every item in its own one (unit_of_work_own), so one bad item does not roll back the others.
+    :param function: by_task method, e.g. RequestService().rate_fixed_by_task
+    :param path: task router path in fexps_api_client, e.g. 'requests.rate_fixed', always in process if None
+    :param kwargs: arguments of in process call
+    """
+    if path and not settings.tasks_in_process:
+        if settings.replicas_count > 1 and not coordinator.is_leader:
+            return {}
+        from app.tasks.permanents.utils.fexps_api_client import fexps_api_client
+        api_function = fexps_api_client.task
+        for name in path.split('.'):
+            api_function = getattr(api_function, name)
+        return await api_function()
+    try:
+        return await function(session=SessionGetByTokenService.get_root_session(), **kwargs)
+    except ApiException as e:
+        raise ValueError(f'{e.__class__.__name__} {e.code}: {e.message}')
@@ -0,0 +1,179 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import List, Optional, Dict
+
+from app.db.models import Action
+from app.repositories import ActionRepository
+from config import settings
+
+
+class ActionArchive:
+    """
+    Archive of old actions: date partitioned gzip JSONL files, one directory per day and one file per batch,
+    assets/actions_archives/YYYY-MM-DD/<first_id>_<last_id>.jsonl.gz
+    Every file has an index <first_id>_<last_id>.index.json of its models and model ids, reads decompress only files
+    whose index has the model id. Rows are deleted from database only after their file is written and read back
+    with the same ids.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.path_actions_archives
+        self.indexes: Dict[str, tuple[float, Dict[str, set]]] = {}
+
+    async def archive(self, horizon: Optional[datetime] = None) -> int:
+        """
+        Move actions older than horizon to archive files in batches of action_archive_batch_size.
+        :param horizon: default now - action_archive_days
+        :return: count of archived actions
+        """
+        if not horizon:
+            horizon = datetime.now() - timedelta(days=settings.action_archive_days)
+        archived = 0
+        actions = []
+        async for action in ActionRepository().stream(
+                custom_where=Action.datetime < horizon,
+                custom_order=Action.id.asc(),
+                chunk_size=settings.action_archive_batch_size,
+        ):
+            actions.append(action)
+            if len(actions) >= settings.action_archive_batch_size:
+                archived += await self._archive_batch(actions=actions)
+                actions = []
+        if actions:
+            archived += await self._archive_batch(actions=actions)
+        logging.info(f'action archive: {archived} actions older than {horizon} archived')
+        return archived
+
+    async def read(
+            self,
+            model: str,
+            model_id: int,
+            action: Optional[str] = None,
+            date_from: Optional[date] = None,
+    ) -> List[Action]:
+        """
+        Archived actions of model, ordered by id. Actions are not attached to any session.
+        :param date_from: skip days before, all days if None
+        """
+        rows = await asyncio.to_thread(self._read_rows, model, model_id, action, date_from)
+        return [
+            Action(
+                id=row['id'],
+                datetime=datetime.fromisoformat(row['datetime']) if row['datetime'] else None,
+                model=row['model'],
+                model_id=row['model_id'],
+                action=row['action'],
+                parameters=row['parameters'],
+            )
+            for row in rows
+        ]
+
+    async def _archive_batch(self, actions: List[Action]) -> int:
+        rows_by_day = defaultdict(list)
+        for action in actions:
+            rows_by_day[action.datetime.date()].append({
+                'id': action.id,
+                'datetime': action.datetime.isoformat(),
+                'model': action.model,
+                'model_id': action.model_id,
+                'action': action.action,
+                'parameters': action.parameters or {},
+            })
+        for day, rows in rows_by_day.items():
+            await asyncio.to_thread(self._write_rows, day, rows)
+        return await ActionRepository().delete_by_ids(ids=[action.id for action in actions])
+
+    def _write_rows(self, day: date, rows: List[dict]) -> None:
+        day_path = os.path.join(self.path, day.isoformat())
+        os.makedirs(day_path, exist_ok=True)
+        file_path = os.path.join(day_path, f'{rows[0]["id"]}_{rows[-1]["id"]}.jsonl.gz')
+        tmp_path = f'{file_path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        with gzip.open(tmp_path, 'rt', encoding='utf-8') as file:
+            ids = [json.loads(line)['id'] for line in file]
+        if ids != [row['id'] for row in rows]:
+            os.remove(tmp_path)
+            raise ValueError(f'action archive verification failed: {file_path}')
+        index = defaultdict(set)
+        for row in rows:
+            index[row['model']].add(row['model_id'])
+        index_path = self._get_index_path(file_path=file_path)
+        with open(f'{index_path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump({model: sorted(model_ids) for model, model_ids in index.items()}, file)
+        os.replace(f'{index_path}.tmp', index_path)
+        os.replace(tmp_path, file_path)
+
+    def _read_rows(self, model: str, model_id: int, action: Optional[str], date_from: Optional[date]) -> List[dict]:
+        if not os.path.isdir(self.path):
+            return []
+        rows = {}
+        for day in sorted(os.listdir(self.path)):
+            if date_from and day < date_from.isoformat():
+                continue
+            day_path = os.path.join(self.path, day)
+            for file_name in sorted(os.listdir(day_path)):
+                if not file_name.endswith('.jsonl.gz'):
+                    continue
+                file_path = os.path.join(day_path, file_name)
+                index = self._get_index(file_path=file_path)
+                if index is not None and model_id not in index.get(model, ()):
+                    continue
+                with gzip.open(file_path, 'rt', encoding='utf-8') as file:
+                    for line in file:
+                        row = json.loads(line)
+                        if row['model'] != model or row['model_id'] != model_id:
+                            continue
+                        if action and row['action'] != action:
+                            continue
+                        # a batch may be archived twice if deletion failed after writing
+                        rows[row['id']] = row
+        return [rows[id_] for id_ in sorted(rows)]
+
+    def _get_index(self, file_path: str) -> Optional[Dict[str, set]]:
+        """
+        :return: model ids by model of archive file, cached until the index changes, None if file has no index
+        """
+        index_path = self._get_index_path(file_path=file_path)
+        try:
+            mtime = os.path.getmtime(index_path)
+        except OSError:
+            return
+        cached = self.indexes.get(index_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(index_path, encoding='utf-8') as file:
+            index = {model: set(model_ids) for model, model_ids in json.load(file).items()}
+        self.indexes[index_path] = (mtime, index)
+        return index
+
+    @staticmethod
+    def _get_index_path(file_path: str) -> str:
+        return file_path.removesuffix('.jsonl.gz') + '.index.json'
+
+
+action_archive = ActionArchive()
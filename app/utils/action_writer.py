@@ -0,0 +1,144 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import session_context
+from app.repositories import ActionRepository
+from config import settings
+
+
+class ActionWriter:
+    """
+    Buffered audit writer: actions are put on a bounded queue and a background flusher writes them in batches,
+    on batch size or after flush seconds. Put waits while the queue is full (backpressure). Failed batches are
+    retried with backoff, then spilled to a local JSONL file to be loaded back by hand.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.flusher: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.flush_errors = 0
+        self.spilled = 0
+        self.flush_latency_last = 0.0
+        self.flush_latency_max = 0.0
+
+    async def put(self, model: str, model_id: int, action: str, parameters: dict) -> None:
+        if self.flusher is None:
+            self.queue = asyncio.Queue(maxsize=settings.action_writer_queue_size)
+            self.flusher = asyncio.create_task(coro=self._flush_loop(), name='action_writer')
+        await self.queue.put({
+            'datetime': datetime.now(),
+            'model': model,
+            'model_id': model_id,
+            'action': action,
+            'parameters': {key: str(value) for key, value in parameters.items()},
+        })
+
+    async def stop(self) -> None:
+        """
+        Flush everything queued and stop the flusher.
+        """
+        if self.flusher is None:
+            return
+        await self.queue.join()
+        self.flusher.cancel()
+        self.flusher = None
+        logging.info(f'action writer stopped, {self.get_stats()}')
+
+    def get_stats(self) -> dict:
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'flushed': self.flushed,
+            'flush_errors': self.flush_errors,
+            'spilled': self.spilled,
+            'flush_latency_last': self.flush_latency_last,
+            'flush_latency_max': self.flush_latency_max,
+        }
+
+    async def _flush_loop(self) -> None:
+        # the task copies the context of the first caller, it must not join that caller unit of work
+        session_context.set(None)
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + settings.action_writer_flush_seconds
+            while len(batch) < settings.action_writer_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch=batch)
+            except Exception as e:
+                logging.critical(f'action writer lost {len(batch)} actions: {e}')
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _flush(self, batch: list[dict]) -> None:
+        started = time.monotonic()
+        for attempt in range(settings.action_writer_flush_retries + 1):
+            if attempt:
+                await asyncio.sleep(settings.action_writer_retry_seconds * 2 ** (attempt - 1))
+            try:
+                await ActionRepository().create_many(objs_in_data=batch)
+                break
+            except Exception as e:
+                self.flush_errors += 1
+                logging.warning(f'action writer failed to flush {len(batch)} actions, attempt {attempt + 1}: {e}')
+        else:
+            self._spill(batch=batch)
+            return
+        self.flushed += len(batch)
+        self.flush_latency_last = time.monotonic() - started
+        self.flush_latency_max = max(self.flush_latency_max, self.flush_latency_last)
+        logging.debug(f'action writer flushed {len(batch)} actions, {self.get_stats()}')
+
+    def _spill(self, batch: list[dict]) -> None:
+        """
+        Last resort for batch which could not be written, one JSON action per line.
+        """
+        ids = ', '.join(f'{action["model"]}:{action["model_id"]}:{action["action"]}' for action in batch)
+        path = os.path.join(settings.path_actions_spills, f'{datetime.now().strftime("%Y-%m-%d")}.jsonl')
+        try:
+            os.makedirs(settings.path_actions_spills, exist_ok=True)
+            lines = [
+                json.dumps({**action, 'datetime': action['datetime'].isoformat()}, default=str) + '\n'
+                for action in batch
+            ]
+            with open(path, 'a') as file:
+                file.writelines(lines)
+        except Exception as e:
+            logging.critical(f'action writer lost {len(batch)} actions ({ids}): {e}')
+            return
+        self.spilled += len(batch)
+        logging.error(f'action writer spilled {len(batch)} actions to {path}: {ids}')
+
+
+action_writer = ActionWriter()
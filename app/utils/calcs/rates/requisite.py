@@ -15,79 +15,129 @@
 #
 
 
+
 import math
-from typing import Optional
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, List
 
-from app.db.models import Method, RequisiteStates, RequisiteTypes, RateTypes, Requisite
+from app.db.models import Method, RequisiteTypes, RateTypes
 from app.repositories import RequisiteRepository
-from app.utils.calcs.requisites.check_empty import calcs_requisite_check_empty
 from app.utils.value import value_to_int, value_to_float
 
 
-async def calcs_requisite_suitable_from_value(
-        requisite: Requisite,
-        need_value: int,
-) -> Optional[tuple[int, int]]:
-    if requisite.is_flex:
-        return
-    value = need_value
-    if value > requisite.value:
-        value = requisite.value
-    rate_float = value_to_float(value=requisite.rate, decimal=requisite.currency.rate_decimal)
-    currency_value = value * rate_float // requisite.currency.div * requisite.currency.div
-    if requisite.currency_value_max and currency_value > requisite.currency_value_max:
-        value = requisite.currency_value_max
-    if requisite.type == RateTypes.INPUT:
-        value = math.ceil(currency_value / rate_float)
-    elif requisite.type == RateTypes.OUTPUT:
-        value = math.floor(currency_value / rate_float)
-    if not value or not currency_value:
-        return
-    return currency_value, value
+class RequisiteRateCurve:
+    """
+    Cumulative fill curve of enabled requisites of method in matching order. Built once, answers blended rate for
+    any number of values: requisites taken fully are summed by prefix sums, only the last partial ones are walked.
+    """
 
+    def __init__(self, requisite_type: str, div: int, rows: List[tuple]):
+        """
+        :param rows: (rate_float, value) of not empty requisites in matching order
+        """
+        self.requisite_type = requisite_type
+        self.div = div
+        self.rows = []
+        values, currency_values = [], []
+        for rate_float, value in rows:
+            result = self.take(rate_float=rate_float, value_max=value, need_value=value)
+            if not result:
+                continue
+            self.rows.append((rate_float, value))
+            currency_values.append(result[0])
+            values.append(result[1])
+        self.prefix_currency_values = [0, *accumulate(currency_values)]
+        self.prefix_values = [0, *accumulate(values)]
+        # requisite i is taken fully if need value >= prefix_values[i] + value, running max makes it searchable
+        self.full_bounds = list(accumulate(
+            (prefix_value + value for prefix_value, (_, value) in zip(self.prefix_values, self.rows)),
+            max,
+        ))
 
-async def calcs_requisite(
-        method: Method,
-        rate_type: str,
-        value: int,
-) -> Optional[int]:
-    need_value = value
-    result_currency_value, result_value = 0, 0
+    def take(self, rate_float: float, value_max: int, need_value: int) -> Optional[tuple[float, int]]:
+        value = need_value
+        if value > value_max:
+            value = value_max
+        currency_value = value * rate_float // self.div * self.div
+        if self.requisite_type == RequisiteTypes.INPUT:
+            value = math.ceil(currency_value / rate_float)
+        else:
+            value = math.floor(currency_value / rate_float)
+        if not value or not currency_value:
+            return
+        return currency_value, value
+
+    def get_rates(self, values: List[int]) -> List[Optional[float]]:
+        return [self.get_rate(value=value) for value in values]
+
+    def get_rate(self, value: int) -> Optional[float]:
+        """
+        :return: blended rate float for value, None if requisites can not cover it
+        """
+        index = bisect_right(self.full_bounds, value)
+        result_currency_value, result_value = self.prefix_currency_values[index], self.prefix_values[index]
+        need_value = value - result_value
+        for rate_float, value_max in self.rows[index:]:
+            if not need_value:
+                break
+            result = self.take(rate_float=rate_float, value_max=value_max, need_value=need_value)
+            if not result:
+                continue
+            need_value -= result[1]
+            result_currency_value += result[0]
+            result_value += result[1]
+        if not result_currency_value or not result_value:
+            return
+        rate_float = result_currency_value / result_value
+        if need_value * rate_float > self.div:
+            return
+        return rate_float
+
+
+async def calcs_requisite_curve(method: Method, rate_type: str) -> RequisiteRateCurve:
     if rate_type == RateTypes.INPUT:
-        requisite_params = {'type': RequisiteTypes.OUTPUT, 'output_method': method, 'state': RequisiteStates.ENABLE}
-        round_method = math.ceil
-        requisites = await RequisiteRepository().get_list_output_by_rate(**requisite_params)
+        requisite_type = RequisiteTypes.OUTPUT
     else:
-        requisite_params = {'type': RequisiteTypes.INPUT, 'input_method': method, 'state': RequisiteStates.ENABLE}
-        round_method = math.floor
-        requisites = await RequisiteRepository().get_list_input_by_rate(**requisite_params)
-    for requisite in requisites:
-        # Check need_value
-        if not need_value:
-            break
-        # Check balance
-        if await calcs_requisite_check_empty(requisite=requisite):
+        requisite_type = RequisiteTypes.INPUT
+    div = method.currency.div
+    rows = []
+    for row in await RequisiteRepository().get_list_book(method_id=method.id, type_=requisite_type):
+        if row.is_flex or not row.rate or not row.value:
             continue
-        # Find suitable value
-        suitable_result = await calcs_requisite_suitable_from_value(requisite=requisite, need_value=need_value)
-        if not suitable_result:
+        if row.currency_value < div or (row.currency_value_min and row.currency_value < row.currency_value_min):
             continue
-        suitable_currency_value, suitable_value = suitable_result
-        need_value -= suitable_value
-        result_currency_value += suitable_currency_value
-        result_value += suitable_value
-    if not result_currency_value or not result_value:
-        return
-    rate_float = result_currency_value / result_value
-    find_currency_value = need_value * rate_float
-    if find_currency_value > method.currency.div:
-        return
-    rate = value_to_int(value=rate_float, decimal=method.currency.rate_decimal, round_method=round_method)
-    return rate
+        rows.append(row)
+    # same order as get_list_output_by_rate and get_list_input_by_rate
+    if requisite_type == RequisiteTypes.OUTPUT:
+        rows.sort(key=lambda row: (-row.rate, row.id))
+    else:
+        rows.sort(key=lambda row: (row.rate, row.id))
+    return RequisiteRateCurve(
+        requisite_type=requisite_type,
+        div=div,
+        rows=[
+            (value_to_float(value=row.rate, decimal=method.currency.rate_decimal), row.value)
+            for row in rows
+        ],
+    )
+
+
+async def calcs_requisite(
+        method: Method,
+        rate_type: str,
+        values: List[int],
+) -> List[Optional[int]]:
+    round_method = math.ceil if rate_type == RateTypes.INPUT else math.floor
+    curve = await calcs_requisite_curve(method=method, rate_type=rate_type)
+    return [
+        value_to_int(value=rate_float, decimal=method.currency.rate_decimal, round_method=round_method)
+        for rate_float in curve.get_rates(values=values)
+    ]
 
 
 async def calcs_rate_requisite(method: Method, rate_type: str) -> Optional[int]:
-    result = await calcs_requisite(method=method, rate_type=rate_type, value=3_000_00)
-    if not result:
+    result = await calcs_requisite(method=method, rate_type=rate_type, values=[3_000_00])
+    if not result[0]:
         return
-    return result
+    return result[0]
@@ -25,11 +25,13 @@ from app.services.wallet_ban import WalletBanService
 
 
 async def request_check_state_input(request: Request):
+    from app.services.request import RequestService
     logging.info(f'Request #{request.id}    start check')
     request = await RequestRepository().get_by_id(id_=request.id)
     if await OrderRepository().get_list(request=request, type=OrderTypes.INPUT, state=OrderStates.WAITING):
         logging.info(f'Request #{request.id}    {request.state}->{RequestStates.INPUT_RESERVATION}')
         await RequestRepository().update(request, state=RequestStates.INPUT_RESERVATION)
+        await RequestService.rate_fixed_schedule(request=request)
         return
     if await OrderRepository().get_list(request=request, type=OrderTypes.INPUT, state=OrderStates.PAYMENT):
         return
@@ -0,0 +1,86 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from typing import AsyncIterator, List, Optional, Set
+
+from app.db.models import Method, RequisiteStates, RequisiteTypes, Requisite
+from app.repositories import RequisiteRepository
+from app.utils.requisite_book import requisite_order_book
+from config import settings
+
+
+async def calcs_requisite_candidates(
+        type_: str,
+        method: Method,
+        exclude_ids: Optional[Set[int]] = None,
+) -> AsyncIterator[Requisite]:
+    """
+    Enabled requisites of method in matching order, ids from order book if it is turned on. Requisites are not
+    locked, matching locks only the taken ones by calcs_requisite_candidate_reserve.
+    :param exclude_ids: ids to skip, e.g. blacklist of request
+    """
+    if settings.requisite_book_enabled:
+        ids_chunks = requisite_order_book.iter_ids(type_=type_, method=method, exclude_ids=exclude_ids)
+    else:
+        ids_chunks = calcs_requisite_candidates_ids(type_=type_, method=method, exclude_ids=exclude_ids)
+    async for ids in ids_chunks:
+        requisites_by_id = {
+            requisite.id: requisite
+            for requisite in await RequisiteRepository().get_list(custom_where=Requisite.id.in_(ids))
+        }
+        for id_ in ids:
+            requisite = requisites_by_id.get(id_)
+            # order book may be behind database
+            if not requisite or requisite.state != RequisiteStates.ENABLE:
+                continue
+            yield requisite
+
+
+async def calcs_requisite_candidate_reserve(requisite: Requisite) -> bool:
+    """
+    Lock requisite chosen by matching till the end of the current transaction, its fields are reloaded.
+    :return: False if requisite is locked by other transaction or is not enabled anymore
+    """
+    requisites = await RequisiteRepository().reserve(ids=[requisite.id])
+    if not requisites:
+        return False
+    return requisites[0].state == RequisiteStates.ENABLE
+
+
+async def calcs_requisite_candidates_ids(
+        type_: str,
+        method: Method,
+        exclude_ids: Optional[Set[int]] = None,
+) -> AsyncIterator[List[int]]:
+    if type_ == RequisiteTypes.OUTPUT:
+        requisite_params = {'type': type_, 'output_method': method, 'state': RequisiteStates.ENABLE}
+        custom_order = Requisite.rate.desc()
+    else:
+        requisite_params = {'type': type_, 'input_method': method, 'state': RequisiteStates.ENABLE}
+        custom_order = Requisite.rate.asc()
+    if method.currency.id_str.lower() == 'usd':
+        custom_order = Requisite.id.asc()
+    custom_where = Requisite.id.notin_(exclude_ids) if exclude_ids else None
+    ids = await RequisiteRepository().get_list_ids(
+        custom_order=custom_order,
+        custom_where=custom_where,
+        **requisite_params,
+    )
+    chunk_size = settings.requisite_reserve_chunk_size
+    for i in range(0, len(ids), chunk_size):
+        yield ids[i:i + chunk_size]
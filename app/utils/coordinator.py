@@ -0,0 +1,178 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import logging
+import os
+import socket
+from functools import wraps
+from typing import Optional, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.session import engine
+from config import settings
+
+
+class Coordinator:
+    """
+    Leader election and scan partitions of tasks_permanents replicas, cron jobs run on the leader only.
+    Every replica holds one of replicas_count slot leases, live slots split partitioned scans between replicas:
+    id % len(live slots) == position of own slot, so shares of a dead replica move to live ones on the next campaign.
+    mysql: GET_LOCK held on own connection, released by MySQL when the replica connection dies.
+    redis: lease keys renewed every third of coordination_lease_seconds.
+    local: one replica, always leader, scans everything.
+    """
+    lock_name = 'fexps_tasks_leader'
+    slot_lock_name = 'fexps_tasks_slot_{}'
+
+    def __init__(self):
+        self.is_leader = False
+        self.is_running = False
+        self.slot: Optional[int] = None
+        self.slots_live: List[int] = []
+        self.replica_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._connection: Optional[AsyncConnection] = None
+        self._redis = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.coordination_lease_seconds / 3)
+            await self.campaign()
+
+    async def campaign(self) -> bool:
+        self.is_running = True
+        is_leader, slot, slots_live = self.is_leader, self.slot, self.slots_live
+        try:
+            if settings.coordination_backend == 'mysql':
+                await self._campaign_mysql()
+            elif settings.coordination_backend == 'redis':
+                await self._campaign_redis()
+            else:
+                self.is_leader, self.slot, self.slots_live = True, 0, [0]
+        except Exception as e:
+            logging.error(f'coordinator campaign failed: {e}')
+            self.is_leader, self.slot, self.slots_live = False, None, []
+            await self._close_connection()
+        if is_leader != self.is_leader:
+            logging.info(f'replica {self.replica_id} is_leader={self.is_leader}')
+        if slot != self.slot or slots_live != self.slots_live:
+            logging.info(f'replica {self.replica_id} slot={self.slot} slots_live={self.slots_live}')
+        return self.is_leader
+
+    def get_partition(self) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        :return: None if scans are not split (one replica or coordinator is not running in this process),
+        else (count, index), index is None if replica has no slot and must not scan. Replicas see changes of live
+        slots at different moments, so partitions may overlap for a renew interval, see BaseRepository.stream
+        """
+        if not self.is_running or settings.replicas_count <= 1 or settings.coordination_backend == 'local':
+            return
+        if self.slot is None or self.slot not in self.slots_live:
+            return len(self.slots_live), None
+        return len(self.slots_live), self.slots_live.index(self.slot)
+
+    async def _campaign_mysql(self) -> None:
+        if not self._connection:
+            self._connection = await engine.connect()
+        self.is_leader = await self._lock_mysql(name=self.lock_name)
+        if self.slot is not None and not await self._lock_mysql(name=self.slot_lock_name.format(self.slot)):
+            self.slot = None
+        for slot in range(settings.replicas_count):
+            if self.slot is not None:
+                break
+            if await self._lock_mysql(name=self.slot_lock_name.format(slot)):
+                self.slot = slot
+        names = {f'slot_{slot}': self.slot_lock_name.format(slot) for slot in range(settings.replicas_count)}
+        result = await self._connection.execute(
+            text('SELECT ' + ', '.join(f'IS_USED_LOCK(:{key}) IS NOT NULL' for key in names)),
+            names,
+        )
+        self.slots_live = [slot for slot, is_used in enumerate(result.one()) if is_used]
+
+    async def _lock_mysql(self, name: str) -> bool:
+        """
+        Check lock is held by own connection or take it if it is free.
+        """
+        result = await self._connection.execute(text('SELECT IS_USED_LOCK(:name) = CONNECTION_ID()'), {'name': name})
+        if result.scalar() == 1:
+            return True
+        result = await self._connection.execute(text('SELECT GET_LOCK(:name, 0)'), {'name': name})
+        return result.scalar() == 1
+
+    async def _campaign_redis(self) -> None:
+        if not self._redis:
+            from redis.asyncio import Redis
+            self._redis = Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                username=settings.redis_user,
+                password=settings.redis_password,
+                decode_responses=True,
+            )
+        self.is_leader = await self._lock_redis(name=self.lock_name)
+        if self.slot is not None and not await self._lock_redis(name=self.slot_lock_name.format(self.slot)):
+            self.slot = None
+        for slot in range(settings.replicas_count):
+            if self.slot is not None:
+                break
+            if await self._lock_redis(name=self.slot_lock_name.format(slot)):
+                self.slot = slot
+        holders = await self._redis.mget([self.slot_lock_name.format(slot) for slot in range(settings.replicas_count)])
+        self.slots_live = [slot for slot, holder in enumerate(holders) if holder]
+
+    async def _lock_redis(self, name: str) -> bool:
+        """
+        Renew own lease or take it if it is free.
+        """
+        lease_ms = settings.coordination_lease_seconds * 1000
+        if await self._redis.set(name, self.replica_id, nx=True, px=lease_ms):
+            return True
+        # renew own lease, compare and expire in one step
+        renewed = await self._redis.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0",
+            1,
+            name,
+            self.replica_id,
+            lease_ms,
+        )
+        return renewed == 1
+
+    async def _close_connection(self) -> None:
+        if not self._connection:
+            return
+        try:
+            await self._connection.close()
+        except Exception as e:
+            logging.error(f'coordinator connection close failed: {e}')
+        self._connection = None
+
+
+coordinator = Coordinator()
+
+
+def leader_only(function):
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        if not coordinator.is_leader:
+            logging.info(f'{function.__name__} skipped, replica is not leader')
+            return
+        return await function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,36 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from app.utils.exceptions import WrongCursorFormat
+
+
+def cursor_encode(id_: int) -> str:
+    return urlsafe_b64encode(f'id:{id_}'.encode()).decode().rstrip('=')
+
+
+def cursor_decode(cursor: str) -> int:
+    try:
+        key, id_str = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+        if key != 'id':
+            raise ValueError
+        return int(id_str)
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise WrongCursorFormat()
@@ -0,0 +1,176 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Dict
+
+from app.db.session import run_after_commit
+from config import settings
+
+
+class Deadlines:
+    REQUEST_CONFIRMATION = 'request_confirmation'
+    REQUEST_RATE_FIXED = 'request_rate_fixed'
+    FILE_KEY_CLOSE = 'file_key_close'
+
+
+class DeadlineQueueMemory:
+    """
+    In process timer: heap of deadlines, the worker sleeps until the earliest one or until an earlier one is added.
+    For single process runs and tests only: deadlines reach the worker of the same process, so they are accepted
+    only after the worker of this process started waiting. Processes without worker (api) drop them.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[float, str]] = []
+        self.dues: Dict[str, float] = {}
+        self.changed: Optional[asyncio.Event] = None
+        self.has_consumer = False
+        self.warned = False
+
+    async def add(self, member: str, due: float) -> None:
+        if not self.has_consumer:
+            if not self.warned:
+                self.warned = True
+                logging.warning('deadlines are dropped: memory backend has no worker in this process, use redis')
+            return
+        self.dues[member] = due
+        heapq.heappush(self.heap, (due, member))
+        if self.changed:
+            self.changed.set()
+
+    async def pop_due(self, now: float, count: int) -> List[str]:
+        self.has_consumer = True
+        result = []
+        while self.heap and self.heap[0][0] <= now and len(result) < count:
+            due, member = heapq.heappop(self.heap)
+            # rescheduled members leave stale heap items
+            if self.dues.get(member) != due:
+                continue
+            del self.dues[member]
+            result.append(member)
+        return result
+
+    async def next_due(self) -> Optional[float]:
+        while self.heap and self.dues.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    async def wait(self, timeout: float) -> None:
+        if not self.changed:
+            self.changed = asyncio.Event()
+        self.changed.clear()
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class DeadlineQueueRedis:
+    """
+    Redis sorted set scored by due timestamp. A member is handled by the worker which removed it.
+    """
+
+    def __init__(self):
+        from redis.asyncio import Redis
+        self.redis = Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            username=settings.redis_user,
+            password=settings.redis_password,
+            decode_responses=True,
+        )
+
+    async def add(self, member: str, due: float) -> None:
+        await self.redis.zadd(settings.deadlines_key, {member: due})
+
+    async def pop_due(self, now: float, count: int) -> List[str]:
+        members = await self.redis.zrangebyscore(settings.deadlines_key, min='-inf', max=now, start=0, num=count)
+        if not members:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for member in members:
+                pipeline.zrem(settings.deadlines_key, member)
+            removed = await pipeline.execute()
+        return [member for member, is_removed in zip(members, removed) if is_removed]
+
+    async def next_due(self) -> Optional[float]:
+        result = await self.redis.zrange(settings.deadlines_key, 0, 0, withscores=True)
+        return result[0][1] if result else None
+
+    async def wait(self, timeout: float) -> None:
+        # other processes add deadlines, timeout is capped by deadlines_poll_seconds
+        await asyncio.sleep(timeout)
+
+
+class DeadlineScheduler:
+    """
+    Delay queue of expirations. Due times are naive UTC datetimes, as used by the expiry scans.
+    Deadlines scheduled inside a unit of work are added after its commit. Turned off while deadlines_enabled is False.
+    With several processes (api and tasks_permanents) deadlines_backend must be redis.
+    """
+
+    def __init__(self):
+        self._queue = None
+
+    @property
+    def queue(self) -> DeadlineQueueMemory | DeadlineQueueRedis:
+        if self._queue is None:
+            self._queue = DeadlineQueueRedis() if settings.deadlines_backend == 'redis' else DeadlineQueueMemory()
+        return self._queue
+
+    async def schedule(self, kind: str, id_: int, due: datetime) -> None:
+        if not settings.deadlines_enabled:
+            return
+        await run_after_commit(
+            lambda: self._add(member=f'{kind}:{id_}', due=due.replace(tzinfo=timezone.utc).timestamp()),
+        )
+
+    async def wait_due(self) -> List[Tuple[str, int]]:
+        """
+        Due deadlines, or wait until the next one and return nothing.
+        :return: list of (kind, id)
+        """
+        now = time.time()
+        members = await self.queue.pop_due(now=now, count=settings.deadlines_batch_size)
+        if members:
+            result = []
+            for member in members:
+                kind, id_str = member.split(':')
+                result.append((kind, int(id_str)))
+            return result
+        timeout = settings.deadlines_poll_seconds
+        next_due = await self.queue.next_due()
+        if next_due is not None:
+            timeout = min(max(next_due - now, 0), timeout)
+        await self.queue.wait(timeout=timeout)
+        return []
+
+    async def _add(self, member: str, due: float) -> None:
+        try:
+            await self.queue.add(member=member, due=due)
+        except Exception as e:
+            # expiry scans are the safety net for lost deadlines
+            logging.error(f'deadline schedule failed: {e}')
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -0,0 +1,170 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import asyncio
+import json
+import logging
+import socket
+from typing import List, Optional, Tuple
+
+from app.db.session import run_after_commit
+from config import settings
+
+
+class Events:
+    ORDER_STATE_CHANGED = 'order_state_changed'
+    REQUISITE_LIQUIDITY_CHANGED = 'requisite_liquidity_changed'
+    REQUEST_CONFIRMED = 'request_confirmed'
+
+
+class EventQueueMemory:
+    """
+    In process stand-in of the Redis stream, for single process runs and tests only: events reach consumers of the
+    same process. Events are accepted only after a consumer of this process started reading, so processes without
+    consumer (api) do not pile them up. The queue is bounded by events_memory_queue_size, overflow is dropped.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.events_memory_queue_size)
+        self.has_consumer = False
+        self.warned = False
+
+    async def put(self, events: List[dict]) -> None:
+        if not self.has_consumer:
+            if not self.warned:
+                self.warned = True
+                logging.warning('events are dropped: memory backend has no consumer in this process, use redis')
+            return
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logging.warning(f'events memory queue is full, event dropped: {event}')
+
+    async def read(self, count: int, timeout: float) -> List[Tuple[Optional[str], dict]]:
+        self.has_consumer = True
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        result = [(None, event)]
+        while len(result) < count and not self.queue.empty():
+            result.append((None, self.queue.get_nowait()))
+        return result
+
+    async def ack(self, ids: List[str]) -> None:
+        pass
+
+
+class EventQueueRedis:
+    """
+    Redis stream with one consumer group, every event is handled by one consumer of the group.
+    """
+    group = 'requests'
+
+    def __init__(self):
+        from redis.asyncio import Redis
+        self.redis = Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            username=settings.redis_user,
+            password=settings.redis_password,
+            decode_responses=True,
+        )
+        self.consumer = socket.gethostname()
+        self.group_created = False
+
+    async def put(self, events: List[dict]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for event in events:
+                pipeline.xadd(
+                    name=settings.events_stream,
+                    fields={'event': json.dumps(event)},
+                    maxlen=settings.events_stream_max_length,
+                    approximate=True,
+                )
+            await pipeline.execute()
+
+    async def read(self, count: int, timeout: float) -> List[Tuple[Optional[str], dict]]:
+        if not self.group_created:
+            try:
+                await self.redis.xgroup_create(name=settings.events_stream, groupname=self.group, id='$', mkstream=True)
+            except Exception as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+            self.group_created = True
+        streams = await self.redis.xreadgroup(
+            groupname=self.group,
+            consumername=self.consumer,
+            streams={settings.events_stream: '>'},
+            count=count,
+            block=int(timeout * 1000),
+        )
+        result = []
+        for _, messages in streams or []:
+            for id_, fields in messages:
+                result.append((id_, json.loads(fields['event'])))
+        return result
+
+    async def ack(self, ids: List[str]) -> None:
+        if ids:
+            await self.redis.xack(settings.events_stream, self.group, *ids)
+
+
+class EventBus:
+    """
+    Domain events of requests state machine. Published inside a unit of work they are sent after its commit,
+    so consumers never see uncommitted state. Turned off while events_enabled is False. With several processes
+    (api and tasks_permanents) events_backend must be redis, memory backend is for single process runs and tests.
+    """
+
+    def __init__(self):
+        self._queue = None
+
+    @property
+    def queue(self) -> EventQueueMemory | EventQueueRedis:
+        if self._queue is None:
+            self._queue = EventQueueRedis() if settings.events_backend == 'redis' else EventQueueMemory()
+        return self._queue
+
+    async def publish(self, name: str, **data) -> None:
+        if not settings.events_enabled:
+            return
+        event = {'name': name, **data}
+        await run_after_commit(lambda: self._put(events=[event]))
+
+    async def read(self) -> List[Tuple[Optional[str], dict]]:
+        """
+        :return: list of (id, event), id is needed for ack
+        """
+        return await self.queue.read(count=settings.events_batch_size, timeout=5)
+
+    async def ack(self, ids: List[str]) -> None:
+        await self.queue.ack(ids=[id_ for id_ in ids if id_])
+
+    async def _put(self, events: List[dict]) -> None:
+        if not events:
+            return
+        try:
+            await self.queue.put(events=events)
+        except Exception as e:
+            # periodic scan is the safety net for lost events
+            logging.error(f'events publish failed: {e}')
+
+
+event_bus = EventBus()
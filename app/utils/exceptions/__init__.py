@@ -21,7 +21,7 @@ from .base import ApiException
 from .commission_pack import CommissionIntervalAlreadyTaken, CommissionIntervalValidationError, IntervalNotExistsError
 from .main import ModelDoesNotExist, NotEnoughPermissions, NoRequiredParameters, ParameterContainError, \
     ParameterOneContainError, ParameterTwoContainError, ParametersAllContainError, ValueMustBePositive, WrongToken, \
-    WrongTokenFormat, MethodNotSupportedRoot, ModelAlreadyExist
+    WrongTokenFormat, MethodNotSupportedRoot, ModelAlreadyExist, WrongCursorFormat
 from .method import MethodFieldsMissing, MethodFieldsParameterMissing, MethodParametersMissing, \
     MethodParametersValidationError, MethodFieldsTypeError
 from .notification import NotificationTelegramAlreadyLinked, NotificationAccountNotFound
@@ -76,3 +76,8 @@ class MethodNotSupportedRoot(ApiException):
 class ModelAlreadyExist(ApiException):
     code = 1011
     message = '{model} with {id_type} "{id_value}" already exist'
+
+
+class WrongCursorFormat(ApiException):
+    code = 1012
+    message = 'Cursor does not match format'
@@ -0,0 +1,201 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple, AsyncIterator, Set
+
+from app.db.models import Requisite, RequisiteTypes, RequisiteStates, Method
+from app.db.session import run_after_commit
+from app.repositories import RequisiteRepository
+from config import settings
+
+
+class RequisiteBookItem:
+    __slots__ = ('id', 'rate', 'currency_value', 'currency_value_min', 'currency_value_max', 'is_flex')
+
+    def __init__(
+            self,
+            id_: int,
+            rate: Optional[int],
+            currency_value: int,
+            currency_value_min: Optional[int],
+            currency_value_max: Optional[int],
+            is_flex: bool,
+    ):
+        self.id = id_
+        self.rate = rate
+        self.currency_value = currency_value
+        self.currency_value_min = currency_value_min
+        self.currency_value_max = currency_value_max
+        self.is_flex = is_flex
+
+    def is_empty(self, div: int) -> bool:
+        if self.currency_value < div:
+            return True
+        return bool(self.currency_value_min) and self.currency_value < self.currency_value_min
+
+
+class RequisiteBook:
+    """
+    Enabled requisites of one (type, method) sorted as matching walks them: input by rate asc, output by rate desc,
+    usd by id asc. Keys are tuples ending with id.
+    """
+
+    def __init__(self, type_: str, by_id: bool, div: int):
+        self.type = type_
+        self.by_id = by_id
+        self.div = div
+        self.keys: List[tuple] = []
+        self.items: Dict[int, RequisiteBookItem] = {}
+        self.loaded_at = time.monotonic()
+
+    def get_key(self, item: RequisiteBookItem) -> tuple:
+        if self.by_id:
+            return item.id,
+        # same order as MySQL, NULL rate first in asc and last in desc
+        if self.type == RequisiteTypes.INPUT:
+            return item.rate is not None, item.rate or 0, item.id
+        return item.rate is None, -(item.rate or 0), item.id
+
+    def upsert(self, item: RequisiteBookItem) -> None:
+        self.remove(id_=item.id)
+        insort(self.keys, self.get_key(item))
+        self.items[item.id] = item
+
+    def remove(self, id_: int) -> None:
+        item = self.items.pop(id_, None)
+        if item is None:
+            return
+        key = self.get_key(item)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            self.keys.pop(index)
+
+    def walk(
+            self,
+            after: Optional[tuple],
+            count: int,
+            exclude_ids: Optional[Set[int]] = None,
+    ) -> Tuple[List[int], Optional[tuple]]:
+        """
+        Next not empty requisites after key, the book may change between walks.
+        :param exclude_ids: ids to skip, e.g. blacklist of request
+        :return: ids and key to continue from
+        """
+        ids = []
+        index = 0 if after is None else bisect_right(self.keys, after)
+        key = after
+        while index < len(self.keys) and len(ids) < count:
+            key = self.keys[index]
+            index += 1
+            if exclude_ids and key[-1] in exclude_ids:
+                continue
+            if not self.items[key[-1]].is_empty(div=self.div):
+                ids.append(key[-1])
+        return ids, key
+
+
+class RequisiteOrderBook:
+    """
+    Order books of requisites per (type, method) kept in memory of the process. Writes made in this process update
+    its books after commit. Writes of other processes (most of them are made by api) are seen only when the book is
+    rebuilt from database: every requisite_book_reconcile_seconds, or on liquidity events if events_enabled.
+    So a book may be stale by that time, books only select candidates, matching works with requisites loaded from
+    database.
+    """
+
+    def __init__(self):
+        self.books: Dict[Tuple[str, int], RequisiteBook] = {}
+
+    async def iter_ids(
+            self,
+            type_: str,
+            method: Method,
+            exclude_ids: Optional[Set[int]] = None,
+    ) -> AsyncIterator[List[int]]:
+        """
+        Chunks of ids of not empty requisites in matching order.
+        """
+        book = await self._get_book(type_=type_, method=method)
+        after = None
+        while True:
+            ids, after = book.walk(after=after, count=settings.requisite_book_chunk_size, exclude_ids=exclude_ids)
+            if not ids:
+                return
+            yield ids
+
+    async def update(self, requisite: Requisite) -> None:
+        """
+        Apply current fields of requisite to the book of this process after commit, books of other processes are not
+        updated.
+        """
+        key = (requisite.type, self._get_method_id(requisite=requisite))
+        item = None
+        if requisite.state == RequisiteStates.ENABLE and not requisite.is_deleted:
+            item = RequisiteBookItem(
+                id_=requisite.id,
+                rate=requisite.rate,
+                currency_value=requisite.currency_value,
+                currency_value_min=requisite.currency_value_min,
+                currency_value_max=requisite.currency_value_max,
+                is_flex=requisite.is_flex,
+            )
+        await run_after_commit(lambda: self._apply(key=key, id_=requisite.id, item=item))
+
+    def invalidate(self, type_: str, method_id: int) -> None:
+        self.books.pop((type_, method_id), None)
+
+    async def _get_book(self, type_: str, method: Method) -> RequisiteBook:
+        by_id = method.currency.id_str.lower() == 'usd'
+        book = self.books.get((type_, method.id))
+        if book and book.by_id == by_id:
+            if time.monotonic() - book.loaded_at < settings.requisite_book_reconcile_seconds:
+                return book
+        book = RequisiteBook(type_=type_, by_id=by_id, div=method.currency.div)
+        for row in await RequisiteRepository().get_list_book(method_id=method.id, type_=type_):
+            book.upsert(
+                item=RequisiteBookItem(
+                    id_=row.id,
+                    rate=row.rate,
+                    currency_value=row.currency_value,
+                    currency_value_min=row.currency_value_min,
+                    currency_value_max=row.currency_value_max,
+                    is_flex=row.is_flex,
+                ),
+            )
+        self.books[(type_, method.id)] = book
+        return book
+
+    async def _apply(self, key: Tuple[str, int], id_: int, item: Optional[RequisiteBookItem]) -> None:
+        book = self.books.get(key)
+        if not book:
+            return
+        if item:
+            book.upsert(item=item)
+        else:
+            book.remove(id_=id_)
+
+    @staticmethod
+    def _get_method_id(requisite: Requisite) -> int:
+        if requisite.type == RequisiteTypes.OUTPUT:
+            return requisite.output_method_id
+        return requisite.input_method_id
+
+
+requisite_order_book = RequisiteOrderBook()
@@ -0,0 +1,30 @@
+#
+# (c) 2024, Yegor Yakubovich, yegoryakubovich.com, personal@yegoryakybovich.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+
+from fastapi import Request, WebSocket
+
+from app.db.session import unit_of_work
+
+
+async def unit_of_work_init(request: Request = None, websocket: WebSocket = None):
+    # websockets live for the whole connection, their repositories keep committing per call
+    if not request:
+        yield
+        return
+    async with unit_of_work():
+        yield
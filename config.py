@@ -54,12 +54,47 @@ class Settings(BaseSettings):
     path_texts_packs: str = 'assets/texts_packs'
     path_files: str = 'assets/files'
     path_telegram: str = 'assets/telegram'
+    path_actions_archives: str = 'assets/actions_archives'
+    path_actions_spills: str = 'assets/actions_spills'
 
     items_per_page: int = 10
+    stream_chunk_size: int = 500
+    action_writer_buffered: bool = False
+    action_writer_queue_size: int = 10000
+    action_writer_batch_size: int = 500
+    action_writer_flush_seconds: float = 1.0
+    action_writer_flush_retries: int = 3
+    action_writer_retry_seconds: float = 1.0
+    action_archive_days: int = 180
+    action_archive_batch_size: int = 5000
+    tasks_in_process: bool = False
+    events_enabled: bool = False
+    events_backend: str = 'memory'
+    events_memory_queue_size: int = 10000
+    events_stream: str = 'fexps_events'
+    events_stream_max_length: int = 100000
+    events_batch_size: int = 100
+    request_state_scan_seconds: int = 2
+    request_reserved_concurrency: int = 8
+    deadlines_enabled: bool = False
+    deadlines_backend: str = 'memory'
+    deadlines_key: str = 'fexps_deadlines'
+    deadlines_batch_size: int = 100
+    deadlines_poll_seconds: float = 1.0
+    expiry_scan_seconds: int = 2
+    expiry_scan_deadlines_seconds: int = 300
+    coordination_backend: str = 'local'
+    coordination_lease_seconds: int = 30
+    replicas_count: int = 1
+    requisite_book_enabled: bool = False
+    requisite_book_reconcile_seconds: int = 10
+    requisite_book_chunk_size: int = 10
+    requisite_reserve_chunk_size: int = 10
     request_confirmation_check: int = 30
     request_rate_fixed_minutes: int = 60
     file_key_close_minutes: int = 60
     rate_actual_minutes: int = 120
+    rate_requisite_enabled: bool = False
     datetime_format: str = '%d-%m-%y %H:%M'
 
     model_config = SettingsConfigDict(env_file='.env')
@@ -78,6 +113,11 @@ class Settings(BaseSettings):
             f'charset=utf8mb4'
         )
 
+    def get_expiry_scan_seconds(self):
+        if self.deadlines_enabled:
+            return self.expiry_scan_deadlines_seconds
+        return self.expiry_scan_seconds
+
     def get_self_url(self):
         if self.test:
             return self.test_self_url